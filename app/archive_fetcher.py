@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+import abc
+import fcntl
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+# Fetcher settings: backend name and options, connection count and cache size
+FETCHER_CONFIG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'archive-fetcher.json')
+)
+# Fetched archives, inside the local archive folder
+FETCH_CACHE_FOLDER_NAME = '.fetch-cache'
+# Defaults when the config file (or a key) is missing
+DEFAULT_BACKEND = 'local'
+DEFAULT_CONNECTIONS = 4
+FETCH_CACHE_MB = 2048
+# Bytes copied per read when downloading
+FETCH_CHUNK_SIZE = 1024 * 1024
+# Cached archives used this recently are never evicted: another process
+# may have just fetched one and not opened it yet
+FETCH_CACHE_GRACE_SECONDS = 60
+
+
+class ArchiveBackend(abc.ABC):
+    """
+    Where archives come from. Paths are the concrete 'How to find' paths of
+    log-location.json.
+
+    Backends that can read archives in place implement local_path; the others
+    implement connect/exists/open and their archives are downloaded into the
+    fetcher's cache.
+    """
+
+    def connect(self):
+        """Open a client connection (pooled by the fetcher). None if not needed."""
+        return None
+
+    def close(self, connection):
+        """Close a connection returned by connect."""
+
+    def local_path(self, path):
+        """A readable local path for path, or None if it has to be downloaded."""
+        return None
+
+    @abc.abstractmethod
+    def exists(self, connection, path):
+        """Whether the archive at path is available."""
+
+    @abc.abstractmethod
+    def open(self, connection, path):
+        """Readable binary stream of the archive at path."""
+
+
+class LocalDirectoryBackend(ArchiveBackend):
+    """
+    Archives kept in one local folder under their file names (the
+    ../log-files layout), read in place.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, path):
+        return os.path.join(self.root, os.path.basename(path))
+
+    def exists(self, connection, path):
+        return os.path.isfile(self.local_path(path))
+
+    def open(self, connection, path):
+        return open(self.local_path(path), 'rb')
+
+
+# Backend classes by config name; remote and object-store backends add
+# themselves with register_backend
+BACKENDS = {'local': LocalDirectoryBackend}
+
+
+def register_backend(name, backend_class):
+    """Make backend_class selectable as "backend": name in archive-fetcher.json."""
+    BACKENDS[name] = backend_class
+
+
+class ConnectionPool:
+    """At most `size` backend connections at once, reused between transfers."""
+
+    def __init__(self, backend, size):
+        self.backend = backend
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self):
+        self.slots.acquire()
+        try:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = self.backend.connect()
+            try:
+                yield connection
+            except Exception:
+                # The connection may be broken; do not hand it out again
+                self.backend.close(connection)
+                raise
+            self.idle.put(connection)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.backend.close(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class ArchiveCache:
+    """
+    Downloaded archives on disk, capped at max_bytes. A file's mtime is its
+    last use; the least recently used files are deleted first, except those
+    used in the last FETCH_CACHE_GRACE_SECONDS (so the cache may briefly
+    exceed the cap). A lock file serializes eviction across processes
+    sharing the folder. Size the cap
+    above the archives one batch needs, or early ones may be evicted (and
+    fetched again) before they are scanned.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_for(self, path):
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{digest}-{os.path.basename(path)}")
+
+    def lookup(self, path):
+        """The cached copy of path (marked as used), or None."""
+        cached = self.path_for(path)
+        try:
+            os.utime(cached)
+        except FileNotFoundError:
+            return None
+        return cached
+
+    def store(self, path, stream):
+        """Copy stream into the cache as path's archive, evict, and return the cached path."""
+        cached = self.path_for(path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{cached}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as out:
+            shutil.copyfileobj(stream, out, FETCH_CHUNK_SIZE)
+        os.replace(tmp_path, cached)
+        self.evict(keep=cached)
+        return cached
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used archives (never `keep`, nor any used in
+        the grace period) until under max_bytes.
+        """
+        recent = time.time() - FETCH_CACHE_GRACE_SECONDS
+        with open(os.path.join(self.cache_dir, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries = []
+                for name in os.listdir(self.cache_dir):
+                    if name.startswith('.') or name.endswith('.tmp'):
+                        continue
+                    entry = os.path.join(self.cache_dir, name)
+                    try:
+                        st = os.stat(entry)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry))
+                total = sum(size for _, size, _ in entries)
+                for mtime, size, entry in sorted(entries):
+                    if total <= self.max_bytes or mtime >= recent:
+                        break
+                    if entry == keep:
+                        continue
+                    try:
+                        os.remove(entry)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class ArchiveFetcher:
+    """
+    Makes archives available locally. Downloads run on a pool of `connections`
+    threads, so archives queued with prefetch transfer while the caller is
+    busy scanning earlier ones; fetch only waits for the one it needs.
+    """
+
+    def __init__(self, backend, cache_dir, cache_mb=FETCH_CACHE_MB, connections=DEFAULT_CONNECTIONS):
+        self.backend = backend
+        self.cache = ArchiveCache(cache_dir, int(cache_mb * 1024 * 1024))
+        self.pool = ConnectionPool(backend, connections)
+        self.transfers = ThreadPoolExecutor(max_workers=connections)
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def exists(self, path):
+        """Whether the backend has an archive at path."""
+        if self.cache.lookup(path):
+            return True
+        with self.pool.connection() as connection:
+            return self.backend.exists(connection, path)
+
+    def _download(self, path):
+        with self.pool.connection() as connection:
+            found = self.backend.exists(connection, path)
+            if found:
+                with self.backend.open(connection, path) as stream:
+                    return self.cache.store(path, stream)
+        raise FileNotFoundError(f"Archive not found: {path}")
+
+    def _submit(self, path):
+        with self.lock:
+            future = self.pending.get(path)
+            if future is not None:
+                return future
+            future = self.pending[path] = self.transfers.submit(self._download, path)
+        # Outside the lock: the callback runs at once if the transfer already finished
+        future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self.lock:
+            self.pending.pop(path, None)
+
+    def prefetch(self, paths):
+        """Start downloading every archive in paths that is not local or cached yet."""
+        for path in paths:
+            if self.backend.local_path(path) is None and not self.cache.lookup(path):
+                self._submit(path)
+
+    def fetch(self, path):
+        """
+        Local path of the archive at path, waiting for its download if
+        needed. Raises FileNotFoundError if the backend does not have it.
+        """
+        local = self.backend.local_path(path)
+        if local is not None:
+            if not os.path.isfile(local):
+                raise FileNotFoundError(f"Archive not found: {local}")
+            return local
+        return self.cache.lookup(path) or self._submit(path).result()
+
+    def iter_fetched(self, paths):
+        """
+        Yield (path, local path or None if missing) for every path as soon
+        as each is available, local and cached archives first.
+        """
+        futures = {}
+        self.prefetch(paths)
+        for path in paths:
+            local = self.backend.local_path(path) or self.cache.lookup(path)
+            if local is not None:
+                yield path, local if os.path.isfile(local) else None
+            else:
+                futures[self._submit(path)] = path
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except FileNotFoundError:
+                yield futures[future], None
+
+    def close(self):
+        self.transfers.shutdown(wait=True)
+        self.pool.close()
+
+
+def load_fetcher(archive_dir, config_path=FETCHER_CONFIG_PATH):
+    """
+    Build the ArchiveFetcher described by archive-fetcher.json. The local
+    backend defaults to archive_dir as its folder, and the download cache
+    lives in archive_dir/.fetch-cache unless "cacheDir" is given.
+    """
+    cfg = {}
+    if os.path.isfile(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+    name = cfg.get('backend', DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown archive backend {name} in {config_path}")
+    options = dict(cfg.get('options') or {})
+    if name == 'local':
+        options.setdefault('root', archive_dir)
+    return ArchiveFetcher(
+        BACKENDS[name](**options),
+        cfg.get('cacheDir') or os.path.join(archive_dir, FETCH_CACHE_FOLDER_NAME),
+        cache_mb=cfg.get('cacheMb', FETCH_CACHE_MB),
+        connections=cfg.get('connections', DEFAULT_CONNECTIONS),
+    )
+
+
+# One fetcher per local archive folder, shared by every lookup in the process
+_fetchers = {}
+
+
+def get_fetcher(archive_dir):
+    """Return the process-wide ArchiveFetcher for archive_dir."""
+    fetcher = _fetchers.get(archive_dir)
+    if fetcher is None:
+        fetcher = _fetchers[archive_dir] = load_fetcher(archive_dir)
+    return fetcher
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from log_index import request_blocks, resolve_archive, resolve_archive_multi
+from log_stream import merge_scan_results
+
+
+def scan_archive_worker(archive_path, ref_no, sink_path=None):
+    """
+    Resolve ref_no in a single archive (runs inside a worker process).
+    If sink_path is given and the archive has no fresh index, the
+    decompressed log is written there as the step 3 output.
+
+    Returns:
+        (archive_path, ScanResult, sink_written)
+    """
+    scan, from_index = resolve_archive(archive_path, ref_no, sink_path)
+    return archive_path, scan, sink_path is not None and not from_index
+
+
+def add_straddling_rows(archive_scans, request_ids=()):
+    """
+    A request that straddles an hour boundary has rows in the neighbouring
+    archive that do not carry the Ref No, so that archive's own scan misses
+    them. Add every request-id found by any of archive_scans ([(archive_path,
+    ScanResult), ...]), plus request_ids found elsewhere (e.g. the live log),
+    to the scans that lack it, reading its rows through each archive's
+    sidecar index (which the scan left behind).
+    """
+    found = list(dict.fromkeys([rid for _, scan in archive_scans for rid in scan.request_ids]
+                               + list(request_ids)))
+    for archive_path, scan in archive_scans:
+        missing = [rid for rid in found if rid not in scan.blocks]
+        if not missing:
+            continue
+        for rid, blocks in request_blocks(archive_path, missing).items():
+            scan.request_ids.append(rid)
+            scan.blocks[rid] = blocks
+
+
+def scan_archives(archive_paths, ref_no, max_workers=None, sink_paths=None, request_ids=()):
+    """
+    Resolve ref_no across several hourly archives concurrently in a process
+    pool and merge the per-archive results in timestamp order.
+
+    Args:
+        archive_paths: Archives to scan, typically every hour in the search window.
+        ref_no: The Ref No / ExtID to look for.
+        max_workers: Pool size; defaults to min(len(archive_paths), cpu count).
+        sink_paths: Optional { archive_path: step3_path } for archives whose
+                    decompressed log should be materialized.
+        request_ids: Request-ids found elsewhere whose rows in these
+                     archives are collected too (see add_straddling_rows).
+
+    Returns:
+        (merged ScanResult, [archive paths whose sink was written])
+    """
+    sink_paths = sink_paths or {}
+    if len(archive_paths) == 1:
+        path = archive_paths[0]
+        _, scan, written = scan_archive_worker(path, ref_no, sink_paths.get(path))
+        if request_ids:
+            add_straddling_rows([(path, scan)], request_ids)
+            scan.evaluate()
+        return scan, [path] if written else []
+
+    workers = max_workers or min(len(archive_paths), os.cpu_count() or 1)
+    if workers == 1:
+        # Single worker (e.g. inside a batch-mode worker): scan in-process
+        outcomes = [scan_archive_worker(path, ref_no, sink_paths.get(path)) for path in archive_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(scan_archive_worker, path, ref_no, sink_paths.get(path))
+                for path in archive_paths
+            ]
+            outcomes = [future.result() for future in futures]
+
+    add_straddling_rows([(path, scan) for path, scan, _ in outcomes], request_ids)
+    merged = merge_scan_results([scan for _, scan, _ in outcomes], ref_no)
+    written = [path for path, _, was_written in outcomes if was_written]
+    return merged, written
+
+
+def scan_archive_multi_worker(archive_path, ref_nos):
+    """Resolve several Ref Nos in one archive (runs inside a worker process)."""
+    scans, _ = resolve_archive_multi(archive_path, ref_nos)
+    return archive_path, scans
+
+
+def scan_archives_grouped(archive_refs, max_workers=None, ready=None):
+    """
+    Resolve many tickets with one pass per archive instead of one per ticket.
+
+    Args:
+        archive_refs: { archive_path: [ref_no, ...] } - every Ref No that
+                      needs each archive.
+        max_workers: Pool size; defaults to min(len(archive_refs), cpu count).
+        ready: Optional iterable of (key, local path or None) pairs yielding
+               the archive_refs keys as their archives become available
+               (see ArchiveFetcher.iter_fetched). Each archive is scanned as
+               soon as it arrives and missing ones (None) are left out.
+
+    Returns:
+        { archive_path: { ref_no: ScanResult } }
+    """
+    if ready is None:
+        ready = ((path, path) for path in archive_refs)
+    workers = max_workers or min(len(archive_refs), os.cpu_count() or 1)
+    if workers <= 1 or len(archive_refs) <= 1:
+        outcomes = [(key, scan_archive_multi_worker(local, archive_refs[key])[1])
+                    for key, local in ready if local is not None]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                (key, pool.submit(scan_archive_multi_worker, local, archive_refs[key]))
+                for key, local in ready if local is not None
+            ]
+            outcomes = [(key, future.result()[1]) for key, future in futures]
+    return dict(outcomes)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import bot_resolver
+from bot_resolver import (parse_context, resolve_ticket, step1_identify_hour, step2_determine_log_file,
+                          step3_extract_log, STEP_CACHE_FOLDER_NAME)
+from bot_resolver_step4 import step4
+from bot_resolver_step5 import step5
+from bot_resolver_step6 import step6
+from kb_fulltext import FullTextIndex
+from kb_searcher import KBIndex, search_kb
+from row_cache import get_row_cache
+from stack_finder import find_stack
+from synth_data import (CONTEXT_FOLDER_NAME, MANIFEST_NAME, REPORT_FOLDER_NAME, TICKET_FOLDER_NAME,
+                        fulltext_corpus, generate_dataset)
+
+# Default dataset location (generated on first run) and report name
+BENCH_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench-data'))
+REPORT_NAME_FORMAT = "bench-{commit}.json"
+# Queries timed by the full-text case, and query terms per query
+FULLTEXT_QUERIES = 200
+FULLTEXT_QUERY_TERMS = 6
+# Stages in report order
+STAGES = ['parse_context', 'search_kb', 'step1', 'step2', 'step3', 'step4', 'step5', 'step6',
+          'resolve_ticket', 'find_stack']
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or 'unknown' outside a git tree."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__) or '.',
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(func, repeat):
+    """
+    Time func `repeat` times (wall and CPU), then run it once more under
+    tracemalloc for its peak Python allocation.
+
+    Returns:
+        (result of the last call, { 'wallMs': [...], 'cpuMs': [...], 'peakKb': float })
+    """
+    wall, cpu = [], []
+    result = None
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        result = func()
+        wall.append((time.perf_counter() - w0) * 1000)
+        cpu.append((time.process_time() - c0) * 1000)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {'wallMs': wall, 'cpuMs': cpu, 'peakKb': peak / 1024}
+
+
+def _reset_resolver_caches(output_dir):
+    """Forget memoized resolver steps and cached rows so resolve_ticket does the scan."""
+    bot_resolver._resolver_graphs.clear()
+    shutil.rmtree(os.path.join(output_dir, STEP_CACHE_FOLDER_NAME), ignore_errors=True)
+    get_row_cache().clear()
+
+
+def bench_ticket(data_dir, ticket_name, kb_index, repeat):
+    """Measure every stage for one ticket. Returns { stage: measurement }."""
+    context_path = os.path.join(data_dir, CONTEXT_FOLDER_NAME, f"{ticket_name}_context.txt")
+    ticket_path = os.path.join(data_dir, TICKET_FOLDER_NAME, f"{ticket_name}.txt")
+    output_dir = os.path.join(data_dir, bot_resolver.BOT_RESOLVE_FOLDER_NAME)
+    results = {}
+
+    (_, ref_no, _), results['parse_context'] = measure(lambda: parse_context(context_path), repeat)
+    _, results['search_kb'] = measure(lambda: search_kb(context_path, index=kb_index), repeat)
+    (project, dt), results['step1'] = measure(lambda: step1_identify_hour(context_path), repeat)
+    (log_filepath, _), results['step2'] = measure(
+        lambda: step2_determine_log_file(context_path, project, dt), repeat)
+    step3_file, results['step3'] = measure(lambda: step3_extract_log(context_path, log_filepath), repeat)
+    step4_file, results['step4'] = measure(lambda: step4(ref_no, step3_file), repeat)
+    with open(step4_file, 'r', encoding='utf-8') as f:
+        request_id = f.readline().strip()
+    _, results['step5'] = measure(lambda: step5(request_id, step3_file), repeat)
+    _, results['step6'] = measure(lambda: step6(request_id, step3_file), repeat)
+    os.remove(step3_file)
+
+    def resolve():
+        _reset_resolver_caches(output_dir)
+        return resolve_ticket(context_path, max_workers=1, artifact_mode='none')
+    _, results['resolve_ticket'] = measure(resolve, repeat)
+    _, results['find_stack'] = measure(lambda: find_stack(context_path, ticket_path), repeat)
+    return results
+
+
+def bench_fulltext(n_reports, queries=FULLTEXT_QUERIES, seed=0):
+    """
+    Time kb_fulltext searches over an in-memory index of n_reports synthetic
+    reports (synth_data.fulltext_corpus). Each query takes
+    FULLTEXT_QUERY_TERMS words of a random report.
+
+    Returns:
+        { 'reports', 'buildS', 'medianMs', 'p95Ms' }
+    """
+    corpus = fulltext_corpus(n_reports, seed)
+    index = FullTextIndex(os.devnull)
+    started = time.perf_counter()
+    for fn, text in corpus:
+        index.add(fn, 0, text)
+    build_s = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    wall = []
+    for _ in range(queries):
+        text = ' '.join(rng.sample(rng.choice(corpus)[1].split(), FULLTEXT_QUERY_TERMS))
+        w0 = time.perf_counter()
+        index.search(text)
+        wall.append((time.perf_counter() - w0) * 1000)
+    ordered = sorted(wall)
+    return {
+        'reports': n_reports,
+        'buildS': round(build_s, 1),
+        'medianMs': round(statistics.median(wall), 3),
+        'p95Ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def summarize(per_ticket):
+    """Aggregate per-ticket measurements into per-stage statistics."""
+    stages = {}
+    for stage in STAGES:
+        wall = [ms for r in per_ticket for ms in r[stage]['wallMs']]
+        cpu = [ms for r in per_ticket for ms in r[stage]['cpuMs']]
+        if not wall:
+            continue
+        ordered = sorted(wall)
+        stages[stage] = {
+            'medianMs': round(statistics.median(wall), 3),
+            'p95Ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            'meanMs': round(statistics.mean(wall), 3),
+            'cpuMedianMs': round(statistics.median(cpu), 3),
+            'peakKb': round(max(r[stage]['peakKb'] for r in per_ticket), 1),
+        }
+    return stages
+
+
+def run_benchmark(data_dir, repeat=3, max_tickets=None):
+    """
+    Run every stage for each ticket of a generated dataset and return the
+    report dict (commit, environment, dataset manifest and per-stage stats).
+    """
+    with open(os.path.join(data_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    tickets = manifest['tickets'][:max_tickets] if max_tickets else manifest['tickets']
+    kb_index = KBIndex(os.path.join(data_dir, REPORT_FOLDER_NAME))
+
+    per_ticket = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Build the archive indexes and KB lookups once so every ticket sees the same state
+        bench_ticket(data_dir, tickets[0], kb_index, 1)
+        for ticket_name in tickets:
+            per_ticket.append(bench_ticket(data_dir, ticket_name, kb_index, repeat))
+
+    return {
+        'commit': git_commit(),
+        'createdAt': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'tickets': len(tickets),
+        'dataset': {k: v for k, v in manifest.items() if k != 'tickets'},
+        'stages': summarize(per_ticket),
+    }
+
+
+def compare_reports(base, current):
+    """Lines of a per-stage median comparison between two reports."""
+    lines = [f"{'stage':<16}{'base ms':>12}{'current ms':>12}{'change':>10}{'peak KB':>12}"]
+    for stage in STAGES:
+        old, new = base['stages'].get(stage), current['stages'].get(stage)
+        if not new:
+            continue
+        if old and old['medianMs']:
+            change = f"{(new['medianMs'] - old['medianMs']) / old['medianMs'] * 100:+.1f}%"
+            old_ms = f"{old['medianMs']:.3f}"
+        else:
+            change, old_ms = '', '-'
+        lines.append(f"{stage:<16}{old_ms:>12}{new['medianMs']:>12.3f}{change:>10}{new['peakKb']:>12.1f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the triage pipeline on a synthetic dataset")
+    parser.add_argument('--data', default=BENCH_DATA_DIR,
+                        help="dataset directory (generated with synth_data if it has no manifest)")
+    parser.add_argument('--size-mb', type=float, default=8, help="MB per archive when generating")
+    parser.add_argument('--hours', type=int, default=1, help="archives when generating")
+    parser.add_argument('--fanout', type=int, default=10, help="rows per request-id when generating")
+    parser.add_argument('--tickets', type=int, default=10, help="tickets when generating / benchmarking")
+    parser.add_argument('--reports', type=int, default=200, help="KB reports when generating")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage and ticket")
+    parser.add_argument('--out', metavar='PATH', help="report path (default: bench-<commit>.json in --data)")
+    parser.add_argument('--compare', metavar='REPORT', help="earlier report to compare against")
+    parser.add_argument('--fulltext-reports', type=int, default=0, metavar='N',
+                        help="also time full-text search over N synthetic reports (e.g. 100000)")
+    args = parser.parse_args()
+
+    if not os.path.isfile(os.path.join(args.data, MANIFEST_NAME)):
+        generate_dataset(args.data, datetime(2025, 5, 8, 17), args.hours, args.size_mb, args.fanout,
+                         tickets=args.tickets, reports=args.reports)
+
+    report = run_benchmark(args.data, args.repeat, args.tickets)
+    if args.fulltext_reports:
+        report['fulltext'] = bench_fulltext(args.fulltext_reports)
+    out_path = args.out or os.path.join(args.data, REPORT_NAME_FORMAT.format(commit=report['commit']))
+    with open(out_path, 'w', encoding='utf-8') as out:
+        json.dump(report, out, indent=2)
+    print(f"Benchmark report written to {out_path}")
+
+    base = {'stages': {}}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+    for line in compare_reports(base, report):
+        print(line)
+    if 'fulltext' in report:
+        ft = report['fulltext']
+        print(f"full-text search over {ft['reports']} reports: median {ft['medianMs']:.3f} ms, "
+              f"p95 {ft['p95Ms']:.3f} ms (index built in {ft['buildS']} s)")
+
+
+if __name__ == '__main__':
+    main()
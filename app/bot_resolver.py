@@ -1,11 +1,22 @@
 import os
 import re
-import json
 import lzma
-from datetime import datetime
+import shutil
+from datetime import datetime, timedelta
+
+from archive_fetcher import get_fetcher
+from archive_scan import add_straddling_rows, scan_archives, scan_archives_grouped
+from live_log import get_follower
+from log_registry import get_registry
+from log_stream import ScanResult, merge_scan_results
+from shared_log_cache import SHARED_LOG_FOLDER_NAME, SharedLogCache
+from step_graph import Step, StepGraph
+import triage_metrics
 
 # Output folder name (relative to the context file)
 BOT_RESOLVE_FOLDER_NAME = 'bot-resolve'
+# Memoized step outputs, inside the output folder
+STEP_CACHE_FOLDER_NAME = '.step-cache'
 
 # Regex patterns for parsing context
 REF_PATTERN     = re.compile(r'Ref\s*No\.?\s*:?\s*(.+)', re.IGNORECASE)
@@ -15,159 +26,516 @@ DT_PATTERN      = re.compile(r'Date/Time\s*:?\s*([0-9]{4}-[0-9]{2}-[0-9]{2}\s+[0
 # Date/time format for context file
 DT_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-# Path to log-location configuration
-LOG_CONFIG_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '..', 'config', 'log-location.json')
-)
+# What step 3 leaves on disk:
+#   'none'   - nothing; steps 4-6 read the archive (or its index) directly
+#   'shared' - one reference-counted decompressed copy per archive in
+#              bot-resolve/.shared-logs, shared by every ticket on that hour
+#   'full'   - a full decompressed bot-resolve/{ticket}_step_3.log per ticket
+ARTIFACT_MODE = 'none'
+
+# Minutes searched either side of the ticket's Date/Time; every hourly
+# archive overlapping the window is scanned
+SEARCH_WINDOW_MINUTES = 5
 
 
 def load_log_config(project, log_type):
     """
-    Load the log-location.json and return the 'How to find' template for project & log_type.
+    Return the 'How to find' template for project & log_type from the shared
+    log-location registry (reloaded automatically when the file changes).
     Template uses placeholders: {year}, {month}, {date}, {hour}
     """
-    with open(LOG_CONFIG_PATH, 'r', encoding='utf-8') as f:
-        cfg = json.load(f)
-    for entry in cfg:
-        if entry.get('Project') == project and entry.get('Log Type') == log_type:
-            return entry.get('How to find')
-    raise ValueError(f"No log configuration for project={project}, log_type={log_type}")
+    return get_registry().get(project, log_type).template
 
 
-def parse_context(context_path):
+def parse_context_text(text, source='context'):
     """
-    Extract the Project, Ref No., and Date/Time from a ticket context file.
+    Extract the Project, Ref No., and Date/Time from ticket context text.
     Returns (project, ref_no, dt_str).
     """
     project = None
     ref_no  = None
     dt_str  = None
-    with open(context_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if project is None:
-                m_proj = PROJECT_PATTERN.match(line)
-                if m_proj:
-                    project = m_proj.group(1).strip()
-                    continue
-            m_ref = REF_PATTERN.match(line)
-            if m_ref:
-                ref_no = m_ref.group(1).strip()
+    for line in text.splitlines():
+        line = line.strip()
+        if project is None:
+            m_proj = PROJECT_PATTERN.match(line)
+            if m_proj:
+                project = m_proj.group(1).strip()
                 continue
-            m_dt = DT_PATTERN.match(line)
-            if m_dt:
-                dt_str = m_dt.group(1).strip()
+        m_ref = REF_PATTERN.match(line)
+        if m_ref:
+            ref_no = m_ref.group(1).strip()
+            continue
+        m_dt = DT_PATTERN.match(line)
+        if m_dt:
+            dt_str = m_dt.group(1).strip()
     if None in (project, ref_no, dt_str):
-        raise ValueError(f"Unable to parse Project, Ref No, or Date/Time from {context_path}")
+        raise ValueError(f"Unable to parse Project, Ref No, or Date/Time from {source}")
     return project, ref_no, dt_str
 
 
-def step1_identify_hour(context_path):
+def parse_context(context_path):
+    """
+    Extract the Project, Ref No., and Date/Time from a ticket context file.
+    Returns (project, ref_no, dt_str).
+    """
+    with open(context_path, 'r', encoding='utf-8') as f:
+        return parse_context_text(f.read(), context_path)
+
+
+def log_files_for_window(project, dt, window_minutes, log_type='Integration'):
+    """
+    Return the concrete log paths of every hourly archive overlapping
+    [dt - window_minutes, dt + window_minutes], in chronological order.
+    """
+    return get_registry().paths_for_range(
+        project, log_type,
+        dt - timedelta(minutes=window_minutes),
+        dt + timedelta(minutes=window_minutes),
+    )
+
+
+def _output_dir(context_path):
+    ctx_dir = os.path.dirname(context_path)
+    return os.path.abspath(os.path.join(ctx_dir, os.pardir, BOT_RESOLVE_FOLDER_NAME))
+
+
+def _archive_dir(context_path):
+    ctx_dir = os.path.dirname(context_path)
+    return os.path.abspath(os.path.join(ctx_dir, os.pardir, 'log-files'))
+
+
+def _write_step_file(context_path, step, ext, content):
+    output_dir  = _output_dir(context_path)
+    os.makedirs(output_dir, exist_ok=True)
+    ticket_name = os.path.splitext(os.path.basename(context_path))[0]
+    step_file   = os.path.join(output_dir, f"{ticket_name}_step_{step}.{ext}")
+    with open(step_file, 'w', encoding='utf-8') as out:
+        out.write(content)
+    return step_file
+
+
+def step1_identify_hour(context_path, project=None, dt=None):
     """
     Step 1: Identify the hour slice for the log file.
     Writes 'need log of <YYYY-MM-DD.HH>' to bot-resolve/{ticket_name}_step_1.txt.
+    The context file is only parsed when project and dt are not given.
     Returns (project, dt).
     """
-    project, _, dt_str = parse_context(context_path)
-    dt = datetime.strptime(dt_str, DT_FORMAT)
+    if dt is None:
+        project, _, dt_str = parse_context(context_path)
+        dt = datetime.strptime(dt_str, DT_FORMAT)
     log_hour = dt.strftime("%Y-%m-%d.%H")
 
     # Write step 1 output
-    ctx_dir     = os.path.dirname(context_path)
-    output_dir  = os.path.abspath(os.path.join(ctx_dir, os.pardir, BOT_RESOLVE_FOLDER_NAME))
-    os.makedirs(output_dir, exist_ok=True)
-    ticket_name = os.path.splitext(os.path.basename(context_path))[0]
-    step1_file  = os.path.join(output_dir, f"{ticket_name}_step_1.txt")
-    with open(step1_file, 'w', encoding='utf-8') as out:
-        out.write(f"need log of {log_hour}")
-
+    _write_step_file(context_path, 1, 'txt', f"need log of {log_hour}")
     return project, dt
 
 
-def step2_determine_log_file(context_path):
+def step2_determine_log_file(context_path, project=None, dt=None):
     """
     Step 2: Determine the exact log file path using dt from step1 and config template.
     Writes the full path to bot-resolve/{ticket_name}_step_2.txt.
+    Step 1 is only run when project and dt are not given.
     Returns the output file path and the concrete log path.
     """
-    project, dt = step1_identify_hour(context_path)
-
-    # Load template from config
-    template = load_log_config(project, 'Integration')
+    if dt is None:
+        project, dt = step1_identify_hour(context_path)
 
-    # Extract components
-    year   = dt.strftime("%Y")
-    month  = dt.strftime("%m")
-    date   = dt.strftime("%d")
-    hour   = dt.strftime("%H")
-
-    # Format concrete path
-    log_filepath = template.format(year=year, month=month, date=date, hour=hour)
+    # Format concrete path from the pre-parsed config template
+    log_filepath = get_registry().get(project, 'Integration').path_for(dt)
 
     # Write step 2 output
-    ctx_dir     = os.path.dirname(context_path)
-    output_dir  = os.path.abspath(os.path.join(ctx_dir, os.pardir, BOT_RESOLVE_FOLDER_NAME))
-    os.makedirs(output_dir, exist_ok=True)
-    ticket_name = os.path.splitext(os.path.basename(context_path))[0]
-    step2_file  = os.path.join(output_dir, f"{ticket_name}_step_2.txt")
-    with open(step2_file, 'w', encoding='utf-8') as out:
-        out.write(log_filepath)
-
+    step2_file = _write_step_file(context_path, 2, 'txt', log_filepath)
     return log_filepath, step2_file
 
 
-def step3_extract_log(context_path):
+def locate_archive(context_path, log_filepath, archive_dir=None):
     """
-    Step 3: Locate the xz archive under '../log-files', decompress it, and write the raw log.
-    Writes decompressed content to bot-resolve/{ticket_name}_step_3.log.
-    Returns the output log path.
+    Fetch the archive of the concrete log path from step 2 (see
+    archive_fetcher; by default the file of that name under '../log-files')
+    and return its local path. Pass archive_dir to fetch into that folder
+    instead of the one next to context_path.
+    Raises FileNotFoundError if the archive is missing.
     """
-    # Get concrete path and path of step2 file
-    log_filepath, _ = step2_determine_log_file(context_path)
+    if archive_dir is None:
+        archive_dir = _archive_dir(context_path)
+    return get_fetcher(archive_dir).fetch(log_filepath)
 
-    # Determine archive directory and file name
-    ctx_dir      = os.path.dirname(context_path)
-    archive_dir  = os.path.abspath(os.path.join(ctx_dir, os.pardir, 'log-files'))
-    archive_name = os.path.basename(log_filepath)
-    archive_path = os.path.join(archive_dir, archive_name)
 
-    if not os.path.isfile(archive_path):
-        raise FileNotFoundError(f"Archive not found: {archive_path}")
+def shared_log_cache(context_path):
+    """SharedLogCache under the bot-resolve folder for this context's tree."""
+    return SharedLogCache(os.path.join(_output_dir(context_path), SHARED_LOG_FOLDER_NAME))
 
-    # Decompress the .xz archive
-    with lzma.open(archive_path, 'rt', encoding='utf-8') as src:
-        content = src.read()
 
-    # Write decompressed log to step 3 file
-    output_dir  = os.path.abspath(os.path.join(ctx_dir, os.pardir, BOT_RESOLVE_FOLDER_NAME))
+def release_ticket_artifacts(context_path):
+    """
+    Release the shared decompressed logs referenced by this ticket; copies no
+    other ticket uses are deleted. Called once the ticket is triaged.
+    Returns the number of copies deleted.
+    """
     ticket_name = os.path.splitext(os.path.basename(context_path))[0]
+    return shared_log_cache(context_path).release_ticket(ticket_name)
+
+
+def step3_extract_log(context_path, log_filepath=None, shared=False):
+    """
+    Step 3: Locate the xz archive under '../log-files', decompress it, and write the raw log.
+    Writes decompressed content to bot-resolve/{ticket_name}_step_3.log, or with
+    shared=True takes a reference on the archive's shared decompressed copy.
+    Step 2 is only run when log_filepath is not given.
+    Returns the output log path.
+    """
+    if log_filepath is None:
+        log_filepath, _ = step2_determine_log_file(context_path)
+    archive_path = locate_archive(context_path, log_filepath)
+    ticket_name  = os.path.splitext(os.path.basename(context_path))[0]
+    if shared:
+        return shared_log_cache(context_path).acquire(archive_path, ticket_name)
+
+    # Stream-decompress the .xz archive into the step 3 file
+    output_dir  = _output_dir(context_path)
     step3_file  = os.path.join(output_dir, f"{ticket_name}_step_3.log")
-    with open(step3_file, 'w', encoding='utf-8') as out:
-        out.write(content)
+    with lzma.open(archive_path, 'rb') as src, open(step3_file, 'wb') as out:
+        shutil.copyfileobj(src, out)
+        triage_metrics.add('bytesRead', os.path.getsize(archive_path))
+        triage_metrics.add('bytesDecompressed', out.tell())
 
     return step3_file
 
 
-def resolve_ticket(context_path, report_id=None):
+def scan_outputs(scan):
     """
-    Orchestrator: runs steps 1, 2, and 3 in sequence.
-    Returns dict with paths for all step outputs.
+    The step 4, 5 and 6 outputs of a scan, in the same format as
+    bot_resolver_step4/5/6. Returns { 'step_N.ext': text } in step order.
     """
-    project, dt               = step1_identify_hour(context_path)
-    log_filepath, step2_path = step2_determine_log_file(context_path)
-    step3_path               = step3_extract_log(context_path)
-    ticket_name              = os.path.splitext(os.path.basename(context_path))[0]
-    step1_path               = os.path.abspath(
-        os.path.join(os.path.dirname(context_path), os.pardir,
-                     BOT_RESOLVE_FOLDER_NAME, f"{ticket_name}_step_1.txt")
-    )
-    from bot_resolver_step4 import step4
-    ref_no = parse_context(context_path)[1]
+    if scan.request_ids:
+        step4 = "".join(rid + "\n" for rid in sorted(scan.request_ids))
+        step5 = "".join(block + "\n" for rid in scan.request_ids for block in scan.blocks_for(rid))
+    else:
+        step4 = f"No request-id found for ref {scan.ref_no}\n"
+        step5 = f"No log-row found for ref {scan.ref_no}\n"
+    return {
+        'step_4.txt': step4,
+        'step_5.log': step5,
+        'step_6.log': scan.verdict['message'] + "\n",
+    }
+
+
+def step_outputs(log_hour, log_file, scan):
+    """The step 1, 2, 4, 5 and 6 outputs of a resolved ticket, as scan_outputs."""
+    return dict({'step_1.txt': f"need log of {log_hour}", 'step_2.txt': log_file}, **scan_outputs(scan))
+
+
+def write_scan_outputs(output_dir, ticket_name, scan):
+    """
+    Write the step 4, 5 and 6 outputs of a single-pass archive scan in the
+    same format as bot_resolver_step4/5/6.
+    Returns (step4_file, step5_file, step6_file).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, text in scan_outputs(scan).items():
+        path = os.path.join(output_dir, f"{ticket_name}_{name}")
+        with open(path, 'w', encoding='utf-8') as out:
+            out.write(text)
+        paths.append(path)
+    return tuple(paths)
+
+
+# Resolver step graph. Every step receives its inputs directly and outputs
+# JSON-serializable values so they can be memoized across runs.
+
+def _context_step(context_text):
+    project, ref_no, dt_str = parse_context_text(context_text)
+    return {'project': project, 'ref_no': ref_no, 'dt_str': dt_str}
+
+
+def _hour_step(context):
+    # Step 1
+    dt = datetime.strptime(context['dt_str'], DT_FORMAT)
+    return dt.strftime("%Y-%m-%d.%H")
+
+
+def _log_file_step(context):
+    # Step 2
+    dt = datetime.strptime(context['dt_str'], DT_FORMAT)
+    return get_registry().get(context['project'], 'Integration').path_for(dt)
+
+
+def _archives_step(context, log_file, window_minutes, archive_dir):
+    """
+    Every archive in the window the fetcher has, as local [path, size, mtime]
+    so that the scan is re-run whenever an archive changes. The ticket's own
+    hour is required. The window's archives are fetched concurrently.
+    """
+    dt = datetime.strptime(context['dt_str'], DT_FORMAT)
+    fetcher = get_fetcher(archive_dir)
+    paths = log_files_for_window(context['project'], dt, window_minutes)
+    fetcher.prefetch(paths)
+    archives = []
+    for path in paths:
+        try:
+            archive_path = locate_archive(None, path, archive_dir)
+        except FileNotFoundError:
+            if path == log_file:
+                raise
+            continue
+        st = os.stat(archive_path)
+        archives.append([archive_path, st.st_size, st.st_mtime])
+    return archives
+
+
+def _scan_step(context, archives, log_file, archive_dir, max_workers, step3_path, shared_logs):
+    # Steps 3-6: single decompression per archive, step 3 written for the ticket's own hour
+    # (into the shared copy instead, when shared_logs lacks a fresh one)
+    archive_paths = [path for path, _, _ in archives]
+    primary_archive = locate_archive(None, log_file, archive_dir)
+    if shared_logs is not None:
+        step3_path = shared_logs.sink_path(primary_archive)
+    try:
+        scan, written = scan_archives(archive_paths, context['ref_no'], max_workers=max_workers,
+                                      sink_paths={primary_archive: step3_path})
+        if shared_logs is not None and primary_archive in written:
+            shared_logs.install(primary_archive, step3_path)
+    finally:
+        if shared_logs is not None and step3_path and os.path.exists(step3_path):
+            os.remove(step3_path)
+    result = scan.to_dict()
+    result['step3_written'] = primary_archive in written
+    return result
+
+
+RESOLVER_STEPS = [
+    Step('context', _context_step, ['context_text']),
+    Step('hour', _hour_step, ['context']),
+    Step('log_file', _log_file_step, ['context'], memoize=False),
+    Step('archives', _archives_step, ['context', 'log_file', 'window_minutes', 'archive_dir'], memoize=False),
+    Step('scan', _scan_step, ['context', 'archives', 'log_file', 'archive_dir'],
+         params=['max_workers', 'step3_path', 'shared_logs']),
+]
+
+# One graph (and in-memory memo) per output folder
+_resolver_graphs = {}
 
-    output_path = step4(ref_no, step3_path)
-    print("Step 4 output at:", output_path)
+
+def _resolver_graph(output_dir):
+    graph = _resolver_graphs.get(output_dir)
+    if graph is None:
+        cache_dir = os.path.join(output_dir, STEP_CACHE_FOLDER_NAME)
+        graph = _resolver_graphs[output_dir] = StepGraph(RESOLVER_STEPS, cache_dir=cache_dir)
+    return graph
+
+
+def resolve_live(context, window_minutes, archive_dir, max_workers=None):
+    """
+    Steps 4-6 for a ticket whose hour has no archive yet, from the live log
+    of its Integration location (see live_log), merged with the archived
+    hours of the search window. Only local live logs can be followed.
+
+    Returns:
+        (ScanResult, [live log and archive paths used]), or None if there
+        is no live log.
+    """
+    location = get_registry().get(context['project'], 'Integration')
+    fetcher = get_fetcher(archive_dir)
+    live_path = fetcher.backend.local_path(location.live_path)
+    if live_path is None or not os.path.isfile(live_path):
+        return None
+    ref_no = context['ref_no']
+    follower = get_follower(live_path)
+    live = follower.resolve(ref_no)
+    scans = [live]
+    dt = datetime.strptime(context['dt_str'], DT_FORMAT)
+    archives = []
+    for path in log_files_for_window(context['project'], dt, window_minutes):
+        try:
+            archives.append(fetcher.fetch(path))
+        except FileNotFoundError:
+            continue
+    if archives:
+        archived = scan_archives(archives, ref_no, max_workers=max_workers, request_ids=live.request_ids)[0]
+        # Requests that started in the last archived hour and go on in the live log
+        for rid in archived.request_ids:
+            if rid not in live.blocks:
+                blocks = follower.blocks_for(rid)
+                if blocks:
+                    live.request_ids.append(rid)
+                    live.blocks[rid] = blocks
+        scans.append(archived)
+    return merge_scan_results(scans, ref_no), [live_path] + archives
+
+
+def resolve_ticket(context_path, report_id=None, window_minutes=SEARCH_WINDOW_MINUTES, max_workers=None,
+                   artifact_mode=ARTIFACT_MODE, context=None, write_files=True):
+    """
+    Orchestrator: runs the resolver step graph once for the ticket.
+    Steps 1 and 2 pick the hour and log path; steps 3-6 scan every hourly
+    archive within +/- window_minutes of the ticket's Date/Time concurrently
+    (max_workers processes; 1 scans in-process) and merge their rows in
+    timestamp order. Step outputs are memoized by their inputs, so
+    re-triaging the same ticket against unchanged archives skips the scan.
+    artifact_mode (see ARTIFACT_MODE) controls what step 3 leaves on disk;
+    only the matching <log-row> slice of step 5 is always persisted.
+    When the ticket's hour has not been archived yet, steps 4-6 are answered
+    from the live log instead (see resolve_live).
+    Pass the ticket's gather_context.Context as `context` to use its fields
+    instead of reading them back from context_path. With write_files=False
+    the step 1, 2, 4, 5 and 6 files are not written (their paths are None);
+    their contents are always returned under 'outputs' (see step_outputs).
+    Returns dict with paths for all step outputs and the step 6 verdict.
+    """
+    if context is not None:
+        project, ref_no, dt_str = context.fields()
+        if None in (project, ref_no, dt_str):
+            raise ValueError(f"Unable to parse Project, Ref No, or Date/Time from {context_path}")
+        inputs = {'context': {'project': project, 'ref_no': ref_no, 'dt_str': dt_str}}
+    else:
+        with open(context_path, 'r', encoding='utf-8') as f:
+            inputs = {'context_text': f.read()}
+    output_dir  = _output_dir(context_path)
+    ticket_name = os.path.splitext(os.path.basename(context_path))[0]
+    archive_dir = _archive_dir(context_path)
+    step3_path  = os.path.join(output_dir, f"{ticket_name}_step_3.log") if artifact_mode == 'full' else None
+    shared_logs = shared_log_cache(context_path) if artifact_mode == 'shared' else None
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        values, ran = _resolver_graph(output_dir).run(
+            inputs=dict(inputs, window_minutes=window_minutes, archive_dir=archive_dir),
+            params={'max_workers': max_workers, 'step3_path': step3_path, 'shared_logs': shared_logs},
+        )
+        scan = ScanResult.from_dict(values['scan'])
+        # Re-evaluated so that edited verdict rules apply to memoized scans too
+        scan.evaluate()
+        archives = [path for path, _, _ in values['archives']]
+    except FileNotFoundError:
+        # The ticket's hour may not be rotated into an archive yet
+        context = inputs.get('context') or _context_step(inputs['context_text'])
+        live = resolve_live(context, window_minutes, archive_dir, max_workers)
+        if live is None:
+            raise
+        scan, archives = live
+        values = {'hour': _hour_step(context), 'log_file': _log_file_step(context)}
+        ran = ['live']
+
+    outputs = step_outputs(values['hour'], values['log_file'], scan)
+    step1_path = step2_path = step4_path = step5_path = step6_path = None
+    if write_files:
+        step1_path = _write_step_file(context_path, 1, 'txt', outputs['step_1.txt'])
+        step2_path = _write_step_file(context_path, 2, 'txt', outputs['step_2.txt'])
+        step4_path, step5_path, step6_path = write_scan_outputs(output_dir, ticket_name, scan)
+        print("Step 4 output at:", step4_path)
+        print("Step 5 log snippet at:", step5_path)
+    if 'live' in ran:
+        step3_path = None
+    elif artifact_mode == 'shared':
+        primary_archive = locate_archive(context_path, values['log_file'], archive_dir)
+        # Decompresses only if the scan was served without writing the copy
+        step3_path = shared_logs.acquire(primary_archive, ticket_name)
+    elif artifact_mode == 'full' and ('scan' not in ran or not values['scan']['step3_written']):
+        # The index or the step cache answered the scan without decompressing
+        step3_path = step3_extract_log(context_path, values['log_file'])
+
+    print("Step 6 output:", scan.verdict['message'])
     return {
         'step_1_file': step1_path,
         'step_2_file': step2_path,
-        'step_3_file': step3_path
+        'step_3_file': step3_path,
+        'step_4_file': step4_path,
+        'step_5_file': step5_path,
+        'step_6_file': step6_path,
+        'outputs': outputs,
+        'archives': archives,
+        'verdict': scan.verdict,
+        'steps_run': ran,
     }
+
+
+def resolve_tickets(context_paths, window_minutes=SEARCH_WINDOW_MINUTES, max_workers=None,
+                    write_files=True, contexts=None):
+    """
+    Grouped resolver for a backlog of tickets: collects every pending ticket
+    by the archives its search window needs, then makes one pass per archive
+    that matches all of their Ref Nos at once and routes each matching block
+    to its ticket. Decompression cost is one per hour, not one per ticket.
+    Writes the step 1, 2, 4, 5 and 6 outputs for each ticket, unless
+    write_files is False. contexts maps context paths to their text, for
+    tickets whose context file was not written.
+
+    Returns:
+        { context_path: { 'step_N_file': ..., 'outputs': {...}, 'archives': [...],
+                          'verdict': {...} }
+          or { 'error': str } for tickets that could not be resolved }
+    """
+    results = {}
+    tickets = {}
+    archive_refs = {}
+    fetchers = {}
+    for context_path in context_paths:
+        try:
+            if contexts and context_path in contexts:
+                context = _context_step(contexts[context_path])
+            else:
+                with open(context_path, 'r', encoding='utf-8') as f:
+                    context = _context_step(f.read())
+            log_file = _log_file_step(context)
+            archive_dir = _archive_dir(context_path)
+            fetcher = get_fetcher(archive_dir)
+            if not fetcher.exists(log_file):
+                raise FileNotFoundError(f"Archive not found: {fetcher.backend.local_path(log_file) or log_file}")
+            paths = log_files_for_window(context['project'], datetime.strptime(context['dt_str'], DT_FORMAT),
+                                         window_minutes)
+        except (ValueError, FileNotFoundError) as e:
+            results[context_path] = {'error': str(e)}
+            continue
+        # Start the transfers now; the rest of the batch is queued meanwhile
+        fetcher.prefetch(paths)
+        tickets[context_path] = (context, log_file, paths)
+        for path in paths:
+            fetchers.setdefault(path, fetcher)
+            refs = archive_refs.setdefault(path, [])
+            if context['ref_no'] not in refs:
+                refs.append(context['ref_no'])
+
+    # Archives are scanned as they arrive, overlapping the remaining transfers
+    local_paths = {}
+
+    def ready():
+        for fetcher in set(fetchers.values()):
+            paths = [path for path in archive_refs if fetchers[path] is fetcher]
+            for path, local in fetcher.iter_fetched(paths):
+                local_paths[path] = local
+                yield path, local
+
+    scans = scan_archives_grouped(archive_refs, max_workers=max_workers, ready=ready()) if archive_refs else {}
+
+    for context_path, (context, log_file, paths) in tickets.items():
+        ref_no = context['ref_no']
+        if log_file not in scans:
+            results[context_path] = {'error': f"Archive not found: {log_file}"}
+            continue
+        archives = [local_paths[path] for path in paths if path in scans]
+        archive_scans = [(local_paths[path], scans[path][ref_no]) for path in paths if path in scans]
+        add_straddling_rows(archive_scans)
+        scan = merge_scan_results([scan for _, scan in archive_scans], ref_no)
+        ticket_name = os.path.splitext(os.path.basename(context_path))[0]
+        outputs = step_outputs(_hour_step(context), log_file, scan)
+        step1_path = step2_path = step4_path = step5_path = step6_path = None
+        if write_files:
+            step1_path = _write_step_file(context_path, 1, 'txt', outputs['step_1.txt'])
+            step2_path = _write_step_file(context_path, 2, 'txt', outputs['step_2.txt'])
+            step4_path, step5_path, step6_path = write_scan_outputs(_output_dir(context_path), ticket_name, scan)
+        print(f"{ticket_name}: {scan.verdict['message']}")
+        results[context_path] = {
+            'step_1_file': step1_path,
+            'step_2_file': step2_path,
+            'step_3_file': None,
+            'step_4_file': step4_path,
+            'step_5_file': step5_path,
+            'step_6_file': step6_path,
+            'outputs': outputs,
+            'archives': archives,
+            'verdict': scan.verdict,
+        }
+    return results
@@ -1,9 +1,8 @@
 # bot_resolver_step4.py
 import os
-import re
 
-# Pattern to extract request-id from log-row blocks
-REQUEST_ID_PATTERN = re.compile(r'<request-id>([^<]+)</request-id>', re.IGNORECASE)
+from log_stream import block_ext_ids
+from mmap_scan import find_request_ids
 
 # Output folder name (relative to context)
 BOT_RESOLVE_FOLDER_NAME = 'bot-resolve'
@@ -22,24 +21,10 @@ def step4(ref_no: str, log_file_path: str) -> str:
     Returns:
         Path to the generated step_4 output file.
     """
-    # Ensure log exists
-    if not os.path.isfile(log_file_path):
-        raise FileNotFoundError(f"Log file not found: {log_file_path}")
-
-    # Read entire log content
-    with open(log_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Find all <log-row>...</log-row> blocks
-    blocks = re.findall(r'<log-row>(.*?)</log-row>', content, re.DOTALL | re.IGNORECASE)
-
-    # Collect found request IDs where ref_no appears in the block
-    found_ids = set()
-    for block in blocks:
-        if ref_no in block:
-            m = REQUEST_ID_PATTERN.search(block)
-            if m:
-                found_ids.add(m.group(1))
+    # Collect request IDs of the blocks carrying ref_no as an ExtID, the rule
+    # the streaming scan and sidecar index use (memory-mapped scan; raises
+    # FileNotFoundError if the log is missing)
+    found_ids = set(find_request_ids(log_file_path, ref_no, accept=lambda block: ref_no in block_ext_ids(block)))
 
     # Determine ticket name and output path
     ticket_name = os.path.basename(log_file_path).replace('_step_3.log', '')
@@ -54,9 +39,5 @@ def step4(ref_no: str, log_file_path: str) -> str:
                 out.write(rid + "\n")
         else:
             out.write(f"No request-id found for ref {ref_no}\n")
-    from bot_resolver_step5 import step5
-
-    out_path = step5(rid, log_file_path)
-    print("Step 5 log snippet at:", out_path)
 
     return step4_file
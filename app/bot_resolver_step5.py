@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 import os
-import re
+
+from mmap_scan import find_request_blocks
 
 # Output folder name (relative to context)
 BOT_RESOLVE_FOLDER_NAME = 'bot-resolve'
 
-# Regex to capture entire <log-row> block
-LOG_ROW_BLOCK_PATTERN = re.compile(r'(<log-row>.*?</log-row>)', re.DOTALL | re.IGNORECASE)
-
 
 def step5(request_id: str, log_file_path: str) -> str:
     """
@@ -22,20 +20,9 @@ def step5(request_id: str, log_file_path: str) -> str:
     Returns:
         Path to the generated step_5 log snippet file.
     """
-    # Validate inputs
-    if not os.path.isfile(log_file_path):
-        raise FileNotFoundError(f"Log file not found: {log_file_path}")
-
-    # Read the full log content
-    with open(log_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Find all log-row blocks
-    blocks = LOG_ROW_BLOCK_PATTERN.findall(content)
-
-    # Filter blocks containing the exact request-id tag
-    needle = f'<request-id>{request_id}</request-id>'
-    matching_blocks = [block for block in blocks if needle in block]
+    # Blocks containing the exact request-id tag (memory-mapped scan;
+    # raises FileNotFoundError if the log is missing)
+    matching_blocks = find_request_blocks(log_file_path, request_id)
 
     # Prepare output path
     ticket_name = os.path.basename(log_file_path).replace('_step_3.log', '')
@@ -50,10 +37,5 @@ def step5(request_id: str, log_file_path: str) -> str:
                 out.write(block + '\n')
         else:
             out.write(f"No log-row found for request-id {request_id}\n")
-    from bot_resolver_step6 import step6
-
-    step6_path = step6(request_id,
-                       log_file_path)
-    print("Step 6 output:", step6_path)
 
     return step5_file
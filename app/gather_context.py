@@ -3,24 +3,38 @@ import re
 import spacy
 from spacy.cli import download as spacy_download
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Tuple
+
+# Only the entity recognizer is used; the other pipeline components are disabled
+NER_UNUSED_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+# Entity labels consumed by the NER fallback
+NER_LABELS = ("DATE", "TIME", "CARDINAL")
 
 # Load spaCy English model, auto-download if missing
 try:
-    nlp = spacy.load("en_core_web_sm")
+    nlp = spacy.load("en_core_web_sm", disable=NER_UNUSED_PIPES)
 except OSError:
     spacy_download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-
-# Regex patterns for structured fields
-DATE_TIME_PATTERN = re.compile(r"Date/Time[:]?\s*(.*)")
-REF_ID_PATTERN = re.compile(r"(?:ExtID|Ref\.?\s*No\.?|Reference ID)[:]?\s*([A-Za-z0-9_-]+)")
-PROJECT_PATTERN = re.compile(r"Project[:]?\s*(.*)")
-PROBLEM_PATTERN = re.compile(r"(?i)(?:observed the following|problem)\s*(.*)")
-USER_ID_PATTERN = re.compile(r"UserID[:]?\s*(.+)")
-ACCOUNT_PATTERN = re.compile(r"Account\s*No[:]?\s*(.+)")
-ERROR_CODE_PATTERN = re.compile(r"Error\s*Code[:]?\s*(.+)")
+    nlp = spacy.load("en_core_web_sm", disable=NER_UNUSED_PIPES)
+
+
+# Structured fields, one named group each, in per-line priority order.
+# [^\S\n] is whitespace that does not cross into the next line.
+FIELD_PATTERNS = (
+    r"(?i:observed the following|problem)[^\S\n]*(?P<problem>.*)",
+    r"Date/Time[:]?[^\S\n]*(?P<date_time>.*)",
+    r"(?:ExtID|Ref\.?[^\S\n]*No\.?|Reference ID)[:]?[^\S\n]*(?P<reference_id>[A-Za-z0-9_-]+)",
+    r"Project[:]?[^\S\n]*(?P<project>.*)",
+    r"UserID[:]?[^\S\n]*(?P<user_id>.+)",
+    r"Account[^\S\n]*No[:]?[^\S\n]*(?P<account_no>.+)",
+    r"Error[^\S\n]*Code[:]?[^\S\n]*(?P<error_code>.+)",
+)
+# All fields fused into one pattern, so a ticket is scanned once. The lookahead
+# (first letters of every label) lets most positions fail without trying each alternative.
+CONTEXT_FIELD_PATTERN = re.compile("(?=[ADEPRUOoPp])(?:" + "|".join(FIELD_PATTERNS) + ")")
+CONTEXT_FIELDS = tuple(CONTEXT_FIELD_PATTERN.groupindex)
+# Date and time as the resolver and KB search expect them (YYYY-MM-DD HH:MM:SS)
+TIMESTAMP_PATTERN = re.compile(r"([0-9]{4}-[0-9]{2}-[0-9]{2})\s+([0-9]{2}:[0-9]{2}:[0-9]{2})")
 
 @dataclass
 class Context:
@@ -53,6 +67,21 @@ class Context:
             parts.append(f"Error Code: {self.error_code}")
         return "\n".join(parts)
 
+    @property
+    def timestamp(self) -> Optional[str]:
+        """The leading 'YYYY-MM-DD HH:MM:SS' of date_time, or None if it does not start with one."""
+        m = TIMESTAMP_PATTERN.match(self.date_time or '')
+        return f"{m.group(1)} {m.group(2)}" if m else None
+
+    def fields(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        (project, ref_no, dt_str) as the resolver and KB search read them from
+        the context file: the first word of project, reference_id and
+        timestamp, each None if missing.
+        """
+        words = (self.project or '').split()
+        return (words[0] if words else None), self.reference_id, self.timestamp
+
 class GatherContext:
     def __init__(self, default_project: Optional[str] = None):
         """
@@ -61,59 +90,76 @@ class GatherContext:
         self.default_project = default_project
 
     def gather(self, text: str) -> Context:
+        ctx = self._regex_pass(text)
+
+        # Second pass: spaCy NER fallback for date/time and IDs
+        if self._needs_ner(ctx):
+            self._apply_entities(ctx, nlp(text))
+        return ctx
+
+    def gather_many(self, texts: List[str], batch_size: int = 64, n_process: int = 1) -> List[Context]:
+        """
+        Extract contexts for many tickets at once. Tickets whose fields are all
+        filled by the regex pass skip NER; the rest go through nlp.pipe in
+        batches of batch_size, across n_process processes.
+        """
+        contexts = [self._regex_pass(text) for text in texts]
+        pending = [i for i, ctx in enumerate(contexts) if self._needs_ner(ctx)]
+        docs = nlp.pipe((texts[i] for i in pending), batch_size=batch_size, n_process=n_process)
+        for i, doc in zip(pending, docs):
+            self._apply_entities(contexts[i], doc)
+        return contexts
+
+    def _regex_pass(self, text: str) -> Context:
         ctx = Context()
 
-        # First pass: regex extraction per line
-        for line in text.splitlines():
-            if not ctx.problem:
-                m = PROBLEM_PATTERN.search(line)
-                if m:
-                    ctx.problem = m.group(1).strip().capitalize()
-            if not ctx.date_time:
-                m = DATE_TIME_PATTERN.search(line)
-                if m:
-                    ctx.date_time = m.group(1).strip()
-            if not ctx.reference_id:
-                m = REF_ID_PATTERN.search(line)
-                if m:
-                    ctx.reference_id = m.group(1).strip()
-            if not ctx.project:
-                m = PROJECT_PATTERN.search(line)
-                if m:
-                    ctx.project = m.group(1).strip()
-            if not ctx.user_id:
-                m = USER_ID_PATTERN.search(line)
-                if m:
-                    ctx.user_id = m.group(1).strip()
-            if not ctx.account_no:
-                m = ACCOUNT_PATTERN.search(line)
-                if m:
-                    ctx.account_no = m.group(1).strip()
-            if not ctx.error_code:
-                m = ERROR_CODE_PATTERN.search(line)
-                if m:
-                    ctx.error_code = m.group(1).strip()
+        # First pass: one scan with the fused pattern, stopping once every field is filled.
+        # Each search resumes at the value just matched, so a label inside it (two
+        # fields on one line) is still seen.
+        missing = len(CONTEXT_FIELDS)
+        pos = 0
+        while missing:
+            m = CONTEXT_FIELD_PATTERN.search(text, pos)
+            if not m:
+                break
+            field = m.lastgroup
+            pos = m.start(field)
+            if getattr(ctx, field):
+                continue
+            value = m.group(field).strip()
+            if not value:
+                continue
+            setattr(ctx, field, value.capitalize() if field == 'problem' else value)
+            missing -= 1
 
         # Use default project if missing
         if not ctx.project and self.default_project:
             ctx.project = self.default_project
+        return ctx
 
-        # Second pass: spaCy NER fallback for date/time and IDs
-        doc = nlp(text)
+    @staticmethod
+    def _needs_ner(ctx: Context) -> bool:
+        # NER only ever fills date/time and the reference ID
+        return not (ctx.date_time and ctx.reference_id)
+
+    @staticmethod
+    def _apply_entities(ctx: Context, doc) -> None:
         for ent in doc.ents:
+            if ent.label_ not in NER_LABELS:
+                continue
             if ent.label_ in ("DATE", "TIME") and not ctx.date_time:
                 ctx.date_time = ent.text
             if ent.label_ == "CARDINAL" and not ctx.reference_id:
                 # fallback to any cardinal as reference if missing
                 ctx.reference_id = ent.text
-        return ctx
 
 # Top-level function to extract and write context
 # Accepts ticket filename and optional default_project
-def gather_context(ticket_name: str, default_project: Optional[str] = None) -> Context:
+def gather_context(ticket_name: str, default_project: Optional[str] = None, write: bool = True) -> Context:
     """
-    Reads a ticket text file from ../tickets by ticket_name, extracts context,
-    writes it to ../contexts, and returns the Context.
+    Reads a ticket text file from ../tickets by ticket_name (or from ticket_name
+    if it is an absolute path), extracts context, writes it to ../contexts
+    (unless write is False), and returns the Context.
     """
     base_dir = os.path.dirname(__file__)
     tickets_dir = os.path.abspath(os.path.join(base_dir, '..', 'tickets'))
@@ -128,7 +174,9 @@ def gather_context(ticket_name: str, default_project: Optional[str] = None) -> C
     context = gatherer.gather(text)
 
     # Set ticket number from filename
-    context.ticket = os.path.splitext(ticket_name)[0]
+    context.ticket = os.path.splitext(os.path.basename(ticket_name))[0]
+    if not write:
+        return context
 
     # Prepare output path
     contexts_dir = os.path.abspath(os.path.join(tickets_dir, '..', 'contexts'))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import uuid
+from array import array
+
+# Folder holding the on-disk full-text index (sibling of 'reports')
+FULLTEXT_FOLDER_NAME = 'kb-index'
+FULLTEXT_FILE_NAME = 'fulltext.bin'
+FULLTEXT_MAGIC = b'KBFT1\n'
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Compact the index once this fraction of documents are deleted/replaced
+COMPACT_RATIO = 0.2
+# Query terms present in more than this fraction of documents carry almost
+# no weight under BM25 and are skipped to keep queries fast
+MAX_QUERY_DF_RATIO = 0.5
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have in into is it its
+no not of on or our so that the their then there these this to was we were
+when which while will with
+""".split())
+# Crude suffix stripping so that 'exhausted' and 'exhaustion' share a term
+SUFFIXES = ('ions', 'ion', 'ing', 'ed', 'es', 's')
+
+
+def tokenize(text):
+    """Lowercase, split on non-alphanumerics, drop stopwords and strip suffixes."""
+    tokens = []
+    for tok in TOKEN_PATTERN.findall(text.lower()):
+        if len(tok) < 2 or tok in STOPWORDS:
+            continue
+        for suffix in SUFFIXES:
+            if tok.endswith(suffix) and len(tok) - len(suffix) >= 4:
+                tok = tok[:-len(suffix)]
+                break
+        tokens.append(tok)
+    return tokens
+
+
+def report_text(report):
+    """Searchable text of a report: metadata.issue and the what/why/how fields."""
+    meta = report.get('metadata', {})
+    body = report.get('mainContentBody', {})
+    parts = [meta.get('issue') or '']
+    for field in ('whatHappened', 'whyItHappened', 'howResolved'):
+        value = body.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(str(v) for v in value)
+        parts.append(str(value))
+    return '\n'.join(parts)
+
+
+class FullTextIndex:
+    """
+    BM25 inverted index over KB report bodies.
+
+    Postings are kept per term as two uint32 arrays (document ids and term
+    frequencies) and saved to disk as one binary file: a JSON header with
+    the document table and term directory followed by the packed arrays.
+    New or changed reports are appended as new document ids; the previous
+    version of a changed report is tombstoned until the next compaction.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.docs = []          # [filename, mtime, length, deleted]
+        self.doc_ids = {}       # filename -> live document id
+        self.postings = {}      # term -> (array('I') doc ids, array('I') term frequencies)
+        self.total_length = 0
+        self.live_docs = 0
+        self.dir_mtime = None
+        if os.path.isfile(index_path):
+            self.load()
+
+    # Persistence
+
+    def load(self):
+        with open(self.index_path, 'rb') as f:
+            if f.read(len(FULLTEXT_MAGIC)) != FULLTEXT_MAGIC:
+                raise ValueError(f"Not a full-text index: {self.index_path}")
+            header_len = struct.unpack('<I', f.read(4))[0]
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            blob = f.read()
+        self.docs = header['docs']
+        self.postings = {}
+        for term, (offset, count) in header['terms'].items():
+            ids = array('I')
+            ids.frombytes(blob[offset:offset + 4 * count])
+            tfs = array('I')
+            tfs.frombytes(blob[offset + 4 * count:offset + 8 * count])
+            self.postings[term] = (ids, tfs)
+        self._recount()
+
+    def save(self):
+        terms = {}
+        chunks = []
+        offset = 0
+        for term, (ids, tfs) in self.postings.items():
+            terms[term] = [offset, len(ids)]
+            chunks.append(ids.tobytes())
+            chunks.append(tfs.tobytes())
+            offset += 8 * len(ids)
+        header = json.dumps({'docs': self.docs, 'terms': terms}, separators=(',', ':')).encode('utf-8')
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        # Unique per writer: batch workers may build the index at once
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(FULLTEXT_MAGIC)
+            out.write(struct.pack('<I', len(header)))
+            out.write(header)
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(tmp_path, self.index_path)
+
+    def _recount(self):
+        self.doc_ids = {}
+        self.total_length = 0
+        self.live_docs = 0
+        for doc_id, (fn, _, length, deleted) in enumerate(self.docs):
+            if not deleted:
+                self.doc_ids[fn] = doc_id
+                self.total_length += length
+                self.live_docs += 1
+
+    # Updates
+
+    def add(self, fn, mtime, text):
+        """Index (or re-index) one report under its filename."""
+        self.remove(fn)
+        tokens = tokenize(text)
+        doc_id = len(self.docs)
+        self.docs.append([fn, mtime, len(tokens), False])
+        self.doc_ids[fn] = doc_id
+        self.total_length += len(tokens)
+        self.live_docs += 1
+
+        counts = {}
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + 1
+        for term, tf in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array('I'), array('I'))
+            entry[0].append(doc_id)
+            entry[1].append(tf)
+
+    def remove(self, fn):
+        doc_id = self.doc_ids.pop(fn, None)
+        if doc_id is None:
+            return
+        doc = self.docs[doc_id]
+        doc[3] = True
+        self.total_length -= doc[2]
+        self.live_docs -= 1
+
+    def compact(self):
+        """Drop tombstoned documents and renumber the rest."""
+        remap = {}
+        docs = []
+        for doc_id, doc in enumerate(self.docs):
+            if not doc[3]:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+        postings = {}
+        for term, (ids, tfs) in self.postings.items():
+            new_ids, new_tfs = array('I'), array('I')
+            for doc_id, tf in zip(ids, tfs):
+                if doc_id in remap:
+                    new_ids.append(remap[doc_id])
+                    new_tfs.append(tf)
+            if new_ids:
+                postings[term] = (new_ids, new_tfs)
+        self.docs = docs
+        self.postings = postings
+        self._recount()
+
+    def update_from_dir(self, report_dir):
+        """
+        Incrementally sync with the JSON reports in report_dir: index new and
+        modified files, tombstone removed ones. Skipped while the directory
+        mtime is unchanged. Returns True if anything changed.
+        """
+        try:
+            dir_mtime = os.stat(report_dir).st_mtime
+        except OSError:
+            dir_mtime = None
+        if dir_mtime is not None and dir_mtime == self.dir_mtime:
+            return False
+        self.dir_mtime = dir_mtime
+
+        current = {}
+        if os.path.isdir(report_dir):
+            for fn in os.listdir(report_dir):
+                if fn.lower().endswith('.json'):
+                    try:
+                        current[fn] = os.stat(os.path.join(report_dir, fn)).st_mtime
+                    except OSError:
+                        # Deleted or renamed since the listing
+                        continue
+
+        changed = False
+        for fn in list(self.doc_ids):
+            if fn not in current:
+                self.remove(fn)
+                changed = True
+        for fn, mtime in current.items():
+            doc_id = self.doc_ids.get(fn)
+            if doc_id is not None and self.docs[doc_id][1] == mtime:
+                continue
+            try:
+                with open(os.path.join(report_dir, fn), 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+            except Exception:
+                self.remove(fn)
+                continue
+            self.add(fn, mtime, report_text(report))
+            changed = True
+
+        if len(self.docs) and (len(self.docs) - self.live_docs) / len(self.docs) > COMPACT_RATIO:
+            self.compact()
+            changed = True
+        return changed
+
+    # Queries
+
+    def search(self, text, k=5):
+        """
+        Rank reports against free text with BM25.
+        Returns up to k (filename, score) pairs, best first.
+        """
+        if not self.live_docs:
+            return []
+        avgdl = self.total_length / self.live_docs
+        scores = {}
+        for term in set(tokenize(text)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            ids, tfs = entry
+            df = len(ids)
+            if df > 1 and df > MAX_QUERY_DF_RATIO * self.live_docs:
+                continue
+            idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+            docs = self.docs
+            for doc_id, tf in zip(ids, tfs):
+                doc = docs[doc_id]
+                if doc[3]:
+                    continue
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * doc[2] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.docs[doc_id][0], score) for doc_id, score in best]
+
+
+# One FullTextIndex per reports directory, shared by every search in the process
+_fulltext_indexes = {}
+
+
+def get_fulltext_index(report_dir):
+    """
+    Return the process-wide full-text index for report_dir, stored under
+    ../kb-index/fulltext.bin and updated incrementally when reports change.
+    """
+    index_path = os.path.abspath(
+        os.path.join(report_dir, os.pardir, FULLTEXT_FOLDER_NAME, FULLTEXT_FILE_NAME)
+    )
+    index = _fulltext_indexes.get(report_dir)
+    if index is None:
+        index = _fulltext_indexes[report_dir] = FullTextIndex(index_path)
+    if index.update_from_dir(report_dir):
+        index.save()
+    return index
+
+
+def search_text(report_dir, text, k=5):
+    """Top-k (filename, score) reports in report_dir for the given problem text."""
+    return get_fulltext_index(report_dir).search(text, k)
@@ -1,8 +1,11 @@
 import os
+import bisect
 import json
 import re
 from datetime import datetime
 
+from kb_fulltext import search_text
+
 # Folder names (relative to the context file)
 REPORT_FOLDER_NAME = 'reports'
 RESULT_FOLDER_NAME = 'kb-search-result'
@@ -11,9 +14,14 @@ RESULT_FOLDER_NAME = 'kb-search-result'
 REF_PATTERN = re.compile(r'Ref\s*No\.?\s*:?\s*(.+)', re.IGNORECASE)
 DT_PATTERN = re.compile(r'Date/Time\s*:?\s*(.+)', re.IGNORECASE)
 
+PROBLEM_PATTERN = re.compile(r'Problem\s*:?\s*(.+)', re.IGNORECASE)
+
 # Date/time format for context file
 DT_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Number of full-text results reported
+FULLTEXT_TOP_K = 5
+
 
 def parse_context(context_path):
     """
@@ -38,6 +46,17 @@ def parse_context(context_path):
     return ref_no, dt_str
 
 
+def problem_text(context_path):
+    """
+    Text to rank KB reports against: the context's Problem line if present,
+    otherwise the whole context file.
+    """
+    with open(context_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    m = PROBLEM_PATTERN.search(text)
+    return m.group(1).strip() if m else text
+
+
 def load_reports(report_dir):
     """
     Load all JSON files from the given reports directory.
@@ -57,71 +76,196 @@ def load_reports(report_dir):
     return reports
 
 
-def find_best_match(ref_no, dt_str, report_dir):
+class KBIndex:
     """
-    Return the filename of the best-matching report in report_dir.
-    First tries exact metadata.extId match; if none, falls back to nearest occurrence_datetime.
+    In-memory index over the JSON reports in report_dir.
+    Keeps a hash map from metadata.extId to report filename and the
+    occurrence times in a sorted array, so a search is a dict lookup plus a
+    bisect. refresh() re-reads only the files that changed, and only when
+    the directory mtime has moved since the last refresh.
     """
-    reports = load_reports(report_dir)
-    # 1) Exact extId match
-    for fn, rpt in reports.items():
-        meta = rpt.get('metadata', {})
-        if ref_no is not None and meta.get('extId') == ref_no:
-            return fn
-    # 2) Fallback: match by nearest occurrence_datetime
-    closest_fn = None
-    min_diff = None
-    try:
-        ctx_dt = datetime.strptime(dt_str, DT_FORMAT)
-    except Exception:
-        return None
-    for fn, rpt in reports.items():
-        meta = rpt.get('metadata', {})
-        occ = meta.get('occurrence_datetime')
-        if not occ:
-            continue
+
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        self.dir_mtime = None
+        self.reports = {}
+        self.file_mtimes = {}
+        self.ext_ids = {}
+        self.times = []
+        self.time_fns = []
+        self.refresh()
+
+    def refresh(self):
+        """Reload changed, added or removed report files if the directory changed."""
         try:
-            # Parse ISO8601 with offset
-            rep_dt = datetime.fromisoformat(occ)
-            # Convert to naive by dropping tzinfo
-            rep_local = rep_dt.replace(tzinfo=None)
-            diff = abs((rep_local - ctx_dt).total_seconds())
+            dir_mtime = os.stat(self.report_dir).st_mtime
+        except OSError:
+            dir_mtime = None
+        if dir_mtime == self.dir_mtime and dir_mtime is not None:
+            return False
+        self.dir_mtime = dir_mtime
+
+        current = {}
+        if dir_mtime is not None:
+            for fn in os.listdir(self.report_dir):
+                if fn.lower().endswith('.json'):
+                    try:
+                        current[fn] = os.stat(os.path.join(self.report_dir, fn)).st_mtime
+                    except OSError:
+                        continue
+
+        for fn in list(self.reports):
+            if fn not in current:
+                del self.reports[fn]
+                del self.file_mtimes[fn]
+        for fn, mtime in current.items():
+            if self.file_mtimes.get(fn) == mtime:
+                continue
+            self.file_mtimes[fn] = mtime
+            try:
+                with open(os.path.join(self.report_dir, fn), 'r', encoding='utf-8') as f:
+                    self.reports[fn] = json.load(f)
+            except Exception:
+                self.reports.pop(fn, None)
+        self._rebuild_lookups()
+        return True
+
+    def _rebuild_lookups(self):
+        self.ext_ids = {}
+        timed = []
+        # Sorted by filename so the first report wins on duplicate extIds
+        for fn in sorted(self.reports):
+            meta = self.reports[fn].get('metadata', {})
+            ext_id = meta.get('extId')
+            if ext_id is not None and ext_id not in self.ext_ids:
+                self.ext_ids[ext_id] = fn
+            occ = meta.get('occurrence_datetime')
+            if not occ:
+                continue
+            try:
+                # Parse ISO8601 with offset, convert to naive by dropping tzinfo
+                rep_local = datetime.fromisoformat(occ).replace(tzinfo=None)
+            except Exception:
+                continue
+            timed.append((rep_local, fn))
+        timed.sort()
+        self.times = [t for t, _ in timed]
+        self.time_fns = [fn for _, fn in timed]
+
+    def find_by_ext_id(self, ref_no):
+        return self.ext_ids.get(ref_no)
+
+    def find_nearest(self, ctx_dt):
+        """Filename of the report whose occurrence_datetime is closest to ctx_dt."""
+        if not self.times:
+            return None
+        i = bisect.bisect_left(self.times, ctx_dt)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.times)]
+        best = min(candidates, key=lambda j: abs((self.times[j] - ctx_dt).total_seconds()))
+        return self.time_fns[best]
+
+    def find(self, ref_no, dt_str):
+        """Exact extId match first, then the nearest occurrence_datetime."""
+        if ref_no is not None:
+            fn = self.find_by_ext_id(ref_no)
+            if fn is not None:
+                return fn
+        try:
+            ctx_dt = datetime.strptime(dt_str, DT_FORMAT)
         except Exception:
-            continue
-        if min_diff is None or diff < min_diff:
-            min_diff = diff
-            closest_fn = fn
-    return closest_fn
+            return None
+        return self.find_nearest(ctx_dt)
+
+
+# One KBIndex per reports directory, shared by every search in the process
+_kb_indexes = {}
+
+
+def get_kb_index(report_dir):
+    """Return the process-wide KBIndex for report_dir, refreshed if the directory changed."""
+    index = _kb_indexes.get(report_dir)
+    if index is None:
+        index = _kb_indexes[report_dir] = KBIndex(report_dir)
+    else:
+        index.refresh()
+    return index
+
+
+def find_best_match(ref_no, dt_str, report_dir, index=None):
+    """
+    Return the filename of the best-matching report in report_dir.
+    First tries exact metadata.extId match; if none, falls back to nearest occurrence_datetime.
+    Uses the shared KBIndex for report_dir unless `index` is given.
+    """
+    if index is None:
+        index = get_kb_index(report_dir)
+    return index.find(ref_no, dt_str)
 
 
-def search_kb(context_path):
+def result_text(result):
+    """The human-readable result file for a search_kb result dict."""
+    lines = [f"Found matching report: {result['reportId']}" if result['isMatchFound']
+             else "No matching report found."]
+    for match in result['textMatches']:
+        lines.append(f"Full-text match: {match['reportId']} (score {match['score']})")
+    return "\n".join(lines) + "\n"
+
+
+def search_kb(context_path, index=None, context=None, write=True):
     """
     Search the KB for the best-matching report by Ref No and Date/Time.
+    Also ranks reports against the ticket's problem text with BM25; those
+    hits are reported in 'textMatches' only, so a ticket without Ref No or
+    Date/Time is never taken as matched (and goes on to the stack finder).
     Writes a result file to ../kb-search-result and returns a dict:
-      { 'isMatchFound': bool, 'reportId': str }
+      { 'isMatchFound': bool, 'reportId': str, 'matchType': str,
+        'textMatches': [ { 'reportId': str, 'score': float }, ... ] }
+    Pass `index` to search a specific KBIndex instead of the shared one, and
+    the ticket's gather_context.Context as `context` to use its fields
+    instead of reading context_path. With write=False no result file is written.
     """
     # Parse ticket context
-    ref_no, dt_str = parse_context(context_path)
-    if not ref_no or not dt_str:
-        return { 'isMatchFound': False, 'reportId': '' }
+    if context is not None:
+        _, ref_no, dt_str = context.fields()
+        problem = context.problem or str(context)
+    else:
+        try:
+            ref_no, dt_str = parse_context(context_path)
+        except ValueError:
+            ref_no, dt_str = None, None
+        problem = problem_text(context_path)
 
     # Resolve paths
     ctx_dir = os.path.dirname(context_path)
     report_dir = os.path.abspath(os.path.join(ctx_dir, os.pardir, REPORT_FOLDER_NAME))
     result_dir = os.path.abspath(os.path.join(ctx_dir, os.pardir, RESULT_FOLDER_NAME))
-    os.makedirs(result_dir, exist_ok=True)
+
+    # Full-text ranking over report bodies
+    text_matches = [
+        {'reportId': fn, 'score': round(score, 4)}
+        for fn, score in search_text(report_dir, problem, FULLTEXT_TOP_K)
+    ]
 
     # Find match
-    match_fn = find_best_match(ref_no, dt_str, report_dir)
+    match_fn = None
+    match_type = ''
+    if ref_no and dt_str:
+        match_fn = find_best_match(ref_no, dt_str, report_dir, index=index)
+        match_type = 'metadata' if match_fn else ''
     is_found = match_fn is not None
 
+    result = {
+        'isMatchFound': is_found,
+        'reportId': match_fn or '',
+        'matchType': match_type,
+        'textMatches': text_matches,
+    }
+
     # Write human-readable result
-    base = os.path.splitext(os.path.basename(context_path))[0]
-    out_path = os.path.join(result_dir, f"{base}_result.txt")
-    with open(out_path, 'w', encoding='utf-8') as out:
-        if is_found:
-            out.write(f"Found matching report: {match_fn}\n")
-        else:
-            out.write("No matching report found.\n")
-
-    return { 'isMatchFound': is_found, 'reportId': match_fn or '' }
+    if write:
+        os.makedirs(result_dir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(context_path))[0]
+        out_path = os.path.join(result_dir, f"{base}_result.txt")
+        with open(out_path, 'w', encoding='utf-8') as out:
+            out.write(result_text(result))
+    return result
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from log_stream import LOG_ROW_BYTES_PATTERN, REQUEST_ID_PATTERN, ScanResult, block_ext_ids
+
+# Read position saved next to the live log after every poll: <log>.follow.json
+CHECKPOINT_SUFFIX = '.follow.json'
+# Rolling index snapshot saved next to the live log: <log>.follow-index.json
+INDEX_SNAPSHOT_SUFFIX = '.follow-index.json'
+CHECKPOINT_VERSION = 2
+# Seconds between index snapshots while following
+INDEX_SAVE_INTERVAL = 60.0
+# Request-ids (and ExtIDs) kept in the rolling index, least recently logged dropped first
+LIVE_INDEX_REQUESTS = 20000
+# Bytes read from the live log per read
+READ_CHUNK_SIZE = 1024 * 1024
+# Seconds between polls in follow mode
+FOLLOW_INTERVAL = 1.0
+
+
+def checkpoint_path_for(log_path):
+    return log_path + CHECKPOINT_SUFFIX
+
+
+def index_snapshot_path_for(log_path):
+    return log_path + INDEX_SNAPSHOT_SUFFIX
+
+
+def _write_json(path, data):
+    # Unique per writer: every batch worker follows the same live log
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        json.dump(data, out, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class LiveLogFollower:
+    """
+    Tails the uncompressed log that is still being written for the current
+    hour and keeps a rolling index of its recent request-ids and ExtIDs.
+
+    Each poll reads only what was appended since the last one: `offset` is
+    the end of the last complete <log-row> block, so a block cut off by a
+    read is re-read whole next time. Every poll that read something saves
+    the offset and the file's inode and size to a small checkpoint. The
+    index itself is snapshotted, with the offset it covers, at most every
+    save_interval seconds and on close, so a busy log is not rewritten in
+    full on each poll. A restarted follower carries on from the snapshot
+    and re-reads what was logged after it. A new inode or a file shorter
+    than the offset (rotation, truncation) restarts from the beginning
+    with an empty index.
+
+    The index holds (offset, length) spans; blocks are read back from the
+    live file on lookup.
+    """
+
+    def __init__(self, log_path, checkpoint_path=None, snapshot_path=None, max_requests=LIVE_INDEX_REQUESTS,
+                 save_interval=INDEX_SAVE_INTERVAL):
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path or checkpoint_path_for(log_path)
+        self.snapshot_path = snapshot_path or index_snapshot_path_for(log_path)
+        self.max_requests = max_requests
+        self.save_interval = save_interval
+        self.inode = None
+        self.offset = 0
+        self.requests = OrderedDict()   # request-id -> [[offset, length], ...]
+        self.ext_ids = OrderedDict()    # ExtID -> [request-id, ...]
+        self.snapshot_offset = 0
+        self.snapshot_time = time.monotonic()
+        self._load_snapshot()
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.offset = 0
+        # A different file now; the old snapshot no longer applies
+        self.snapshot_offset = None
+        self.requests.clear()
+        self.ext_ids.clear()
+
+    def _load_snapshot(self):
+        if not os.path.isfile(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if data.get('version') != CHECKPOINT_VERSION:
+            return
+        self.inode = data['inode']
+        self.offset = self.snapshot_offset = data['offset']
+        self.requests = OrderedDict(data['requests'])
+        self.ext_ids = OrderedDict(data['ext_ids'])
+
+    def save_checkpoint(self, size):
+        """Save the read position; cheap enough for every poll."""
+        _write_json(self.checkpoint_path, {
+            'version': CHECKPOINT_VERSION,
+            'log_path': self.log_path,
+            'inode': self.inode,
+            'offset': self.offset,
+            'size': size,
+        })
+
+    def save_snapshot(self):
+        """Save the rolling index and the offset it covers."""
+        _write_json(self.snapshot_path, {
+            'version': CHECKPOINT_VERSION,
+            'log_path': self.log_path,
+            'inode': self.inode,
+            'offset': self.offset,
+            'requests': list(self.requests.items()),
+            'ext_ids': list(self.ext_ids.items()),
+        })
+        self.snapshot_offset = self.offset
+        self.snapshot_time = time.monotonic()
+
+    def close(self):
+        """Snapshot the index if it changed since the last snapshot."""
+        if self.offset != self.snapshot_offset:
+            self.save_snapshot()
+
+    def _add(self, offset, length, block):
+        m = REQUEST_ID_PATTERN.search(block)
+        if not m:
+            return
+        rid = m.group(1)
+        spans = self.requests.pop(rid, None)
+        if spans is None:
+            spans = []
+        spans.append([offset, length])
+        self.requests[rid] = spans
+        for ext_id in block_ext_ids(block):
+            rids = self.ext_ids.pop(ext_id, None)
+            if rids is None:
+                rids = []
+            if rid not in rids:
+                rids.append(rid)
+            self.ext_ids[ext_id] = rids
+        while len(self.requests) > self.max_requests:
+            self.requests.popitem(last=False)
+        while len(self.ext_ids) > self.max_requests:
+            self.ext_ids.popitem(last=False)
+
+    def poll(self):
+        """
+        Index the blocks appended since the last poll and checkpoint.
+        Returns the number of new blocks (0 if the log does not exist).
+        """
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return 0
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self._reset(st.st_ino)
+        if st.st_size == self.offset:
+            return 0
+
+        added = 0
+        with open(self.log_path, 'rb') as src:
+            src.seek(self.offset)
+            buffer = b''
+            buffer_offset = self.offset
+            while True:
+                data = src.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                buffer += data
+                end = 0
+                for m in LOG_ROW_BYTES_PATTERN.finditer(buffer):
+                    self._add(buffer_offset + m.start(), m.end() - m.start(),
+                              m.group(0).decode('utf-8', errors='replace'))
+                    end = m.end()
+                    added += 1
+                # Keep the unfinished block for the next read (or the next poll)
+                buffer = buffer[end:]
+                buffer_offset += end
+        if buffer_offset != self.offset:
+            self.offset = buffer_offset
+            self.save_checkpoint(st.st_size)
+            if time.monotonic() - self.snapshot_time >= self.save_interval:
+                self.save_snapshot()
+        return added
+
+    def request_ids_for_ref(self, ref_no):
+        """Request-ids of the indexed rows carrying ref_no, in log order."""
+        return [rid for rid in self.ext_ids.get(ref_no, []) if rid in self.requests]
+
+    def blocks_for(self, request_id):
+        """The request-id's <log-row> blocks, read back from the live log."""
+        spans = self.requests.get(request_id, [])
+        if not spans:
+            return []
+        with open(self.log_path, 'rb') as src:
+            return [os.pread(src.fileno(), length, offset).decode('utf-8', errors='replace')
+                    for offset, length in spans]
+
+    def resolve(self, ref_no):
+        """
+        Answer steps 4-6 for ref_no from the live log (polled first).
+
+        Returns:
+            ScanResult, same shape as log_stream.scan_rows.
+        """
+        self.poll()
+        result = ScanResult(ref_no)
+        result.request_ids = self.request_ids_for_ref(ref_no)
+        for rid in result.request_ids:
+            result.blocks[rid] = self.blocks_for(rid)
+            result.rows_scanned += len(result.blocks[rid])
+        result.evaluate()
+        return result
+
+    def follow(self, interval=FOLLOW_INTERVAL, on_poll=None):
+        """Poll every `interval` seconds until interrupted, calling on_poll(new_blocks)."""
+        while True:
+            added = self.poll()
+            if on_poll is not None:
+                on_poll(added)
+            time.sleep(interval)
+
+
+# One follower per live log, shared by every lookup in the process
+_followers = {}
+
+
+def get_follower(log_path):
+    """Return the process-wide LiveLogFollower for log_path."""
+    follower = _followers.get(log_path)
+    if follower is None:
+        follower = _followers[log_path] = LiveLogFollower(log_path)
+    return follower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Follow the live (not yet rotated) log and index it")
+    parser.add_argument('log', help="path of the live uncompressed log")
+    parser.add_argument('--interval', type=float, default=FOLLOW_INTERVAL, help="seconds between polls")
+    args = parser.parse_args()
+    follower = get_follower(args.log)
+
+    def report(added):
+        if added:
+            print(f"{added} new rows; {len(follower.requests)} request-ids, "
+                  f"{len(follower.ext_ids)} ExtIDs indexed, offset {follower.offset}")
+
+    try:
+        follower.follow(args.interval, report)
+    except KeyboardInterrupt:
+        follower.close()
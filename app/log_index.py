@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+import json
+import mmap
+import os
+import re
+import uuid
+
+from log_stream import REQUEST_ID_PATTERN, ScanResult, block_ext_ids, iter_log_rows, scan_rows, scan_rows_multi
+from row_cache import get_row_cache
+
+# Sidecar index file stored next to each archive: <archive>.idx
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 2
+
+# Record types of the index lines, each followed by its key, a tab and the values
+EXT_ID_RECORD = 'E'     # ExtID/Ref No -> request-ids
+REQUEST_RECORD = 'R'    # request-id -> spans
+MINUTE_RECORD = 'M'     # 'YYYY-MM-DD HH:MM' -> spans
+
+# <dateTime>2025-05-08/17:40:47.969/BDT</dateTime> -> minute key 2025-05-08 17:40
+DATETIME_MINUTE_PATTERN = re.compile(
+    r'<dateTime>([0-9]{4}-[0-9]{2}-[0-9]{2})/([0-9]{2}:[0-9]{2})', re.IGNORECASE
+)
+
+
+def index_path_for(archive_path):
+    return archive_path + INDEX_SUFFIX
+
+
+def _spans_text(spans):
+    return ' '.join(f"{offset}:{length}" for offset, length in spans)
+
+
+def _parse_spans(text):
+    spans = []
+    for span in text.split():
+        offset, length = span.split(':')
+        spans.append((int(offset), int(length)))
+    return spans
+
+
+class IndexBuilder:
+    """
+    Accumulates (offset, length, block) rows into the sidecar index: a JSON
+    header line (version, archive size/mtime) followed by one line per key,
+    sorted, so that a lookup is a binary search over the file (see
+    LogIndex) instead of a parse of all of it:
+      E<ExtID>\t<request-id> <request-id> ...      in log order
+      R<request-id>\t<offset>:<length> ...         its <log-row> blocks
+      M<YYYY-MM-DD HH:MM>\t<offset>:<length> ...   blocks logged that minute
+    """
+
+    def __init__(self):
+        self.ext_ids = {}       # ExtID -> {request-id: None}, in log order
+        self.requests = {}      # request-id -> [(offset, length), ...]
+        self.minutes = {}       # minute -> [(offset, length), ...]
+
+    def add(self, offset, length, block):
+        m = REQUEST_ID_PATTERN.search(block)
+        rid = m.group(1) if m else None
+        # Keys and values are separated by whitespace on the index lines
+        if rid is not None and rid.split() == [rid]:
+            self.requests.setdefault(rid, []).append((offset, length))
+            for ext_id in block_ext_ids(block):
+                self.ext_ids.setdefault(ext_id, {})[rid] = None
+
+        m = DATETIME_MINUTE_PATTERN.search(block)
+        if m:
+            self.minutes.setdefault(f"{m.group(1)} {m.group(2)}", []).append((offset, length))
+
+    def tee(self, rows):
+        """Index rows while passing them through to another consumer."""
+        for offset, length, block in rows:
+            self.add(offset, length, block)
+            yield offset, length, block
+
+    def lines(self):
+        """The index lines after the header, as sorted bytes."""
+        lines = [f"{EXT_ID_RECORD}{ext_id}\t{' '.join(rids)}".encode('utf-8')
+                 for ext_id, rids in self.ext_ids.items()]
+        lines += [f"{REQUEST_RECORD}{rid}\t{_spans_text(spans)}".encode('utf-8')
+                  for rid, spans in self.requests.items()]
+        lines += [f"{MINUTE_RECORD}{minute}\t{_spans_text(spans)}".encode('utf-8')
+                  for minute, spans in self.minutes.items()]
+        # Keys hold no control characters, so sorting the lines sorts them by key
+        lines.sort()
+        return lines
+
+    def save(self, archive_path):
+        """Write the index next to the archive atomically and return a LogIndex."""
+        st = os.stat(archive_path)
+        header = {'version': INDEX_VERSION, 'archive_size': st.st_size, 'archive_mtime': st.st_mtime}
+        path = index_path_for(archive_path)
+        # Unique per writer: batch workers may index the same hour at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n')
+            for line in self.lines():
+                out.write(line + b'\n')
+        os.replace(tmp_path, path)
+        return load_index(archive_path)
+
+
+class LogIndex:
+    """
+    A sidecar index mapped read-only. Lookups binary-search the sorted key
+    lines, so only the lines they touch are read and parsed.
+    """
+
+    def __init__(self, archive_path, data, body_start):
+        self.archive_path = archive_path
+        self.data = data
+        self.body_start = body_start
+
+    def _seek(self, prefix):
+        """Offset of the first line >= prefix."""
+        data = self.data
+        lo, hi = self.body_start, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b'\n', lo, mid) + 1 or lo
+            end = data.find(b'\n', start, hi)
+            if end < 0:
+                end = hi
+            if data[start:end] < prefix:
+                lo = end + 1
+            else:
+                hi = start
+        return lo
+
+    def _lines_from(self, prefix):
+        """Lines from the first one >= prefix to the end, decoded."""
+        data = self.data
+        pos = self._seek(prefix)
+        while pos < len(data):
+            end = data.find(b'\n', pos)
+            if end < 0:
+                end = len(data)
+            yield data[pos:end].decode('utf-8')
+            pos = end + 1
+
+    def _values(self, record, key):
+        prefix = f"{record}{key}\t"
+        for line in self._lines_from(prefix.encode('utf-8')):
+            if line.startswith(prefix):
+                return line[len(prefix):]
+            break
+        return None
+
+    def request_ids_for_ref(self, ref_no):
+        """Request-ids of the rows carrying ref_no, in log order."""
+        values = self._values(EXT_ID_RECORD, ref_no)
+        return values.split() if values else []
+
+    def spans_for_request(self, request_id):
+        values = self._values(REQUEST_RECORD, request_id)
+        return _parse_spans(values) if values else []
+
+    def spans_for_minutes(self, start_minute, end_minute):
+        """Spans of the rows logged between two 'YYYY-MM-DD HH:MM' keys, inclusive."""
+        spans = []
+        for line in self._lines_from(f"{MINUTE_RECORD}{start_minute}".encode('utf-8')):
+            if not line.startswith(MINUTE_RECORD):
+                break
+            minute, values = line[len(MINUTE_RECORD):].split('\t', 1)
+            if minute > end_minute:
+                break
+            spans.extend(_parse_spans(values))
+        return sorted(spans)
+
+    def read_spans(self, spans):
+        return get_row_cache().read_spans(self.archive_path, spans)
+
+    def read_minutes(self, start_minute, end_minute):
+        """Blocks logged in a 'YYYY-MM-DD HH:MM' range, inclusive."""
+        return self.read_spans(self.spans_for_minutes(start_minute, end_minute))
+
+
+def is_stale(archive_path, header):
+    """An index is stale when the archive size or mtime no longer match."""
+    try:
+        st = os.stat(archive_path)
+    except OSError:
+        return True
+    return (
+        header.get('version') != INDEX_VERSION
+        or header.get('archive_size') != st.st_size
+        or header.get('archive_mtime') != st.st_mtime
+    )
+
+
+def load_index(archive_path):
+    """
+    Map the sidecar index for archive_path; only its header line is parsed.
+    Returns None if it is missing, unreadable or stale.
+    """
+    path = index_path_for(archive_path)
+    try:
+        with open(path, 'rb') as f:
+            first = f.readline()
+            header = json.loads(first)
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or is_stale(archive_path, header):
+        data.close()
+        return None
+    return LogIndex(archive_path, data, len(first))
+
+
+def build_index(archive_path):
+    """Decompress the archive once and write its sidecar index."""
+    builder = IndexBuilder()
+    for offset, length, block in iter_log_rows(archive_path):
+        builder.add(offset, length, block)
+    return builder.save(archive_path)
+
+
+def get_index(archive_path):
+    """Return a fresh index for archive_path, rebuilding it if stale or missing."""
+    index = load_index(archive_path)
+    if index is None:
+        index = build_index(archive_path)
+    return index
+
+
+def resolve_from_index(index, ref_no):
+    """
+    Answer steps 4-6 for ref_no from the index, reading only the blocks of
+    the matching request-ids from the archive.
+
+    Returns:
+        ScanResult, same shape as log_stream.scan_rows.
+    """
+    result = ScanResult(ref_no)
+    result.request_ids = index.request_ids_for_ref(ref_no)
+    for rid in result.request_ids:
+        spans = index.spans_for_request(rid)
+        result.blocks[rid] = index.read_spans(spans)
+        result.rows_scanned += len(spans)
+    result.evaluate()
+    return result
+
+
+def _archive_rows(archive_path, sink=None):
+    """
+    Rows of archive_path for a full scan: from the row cache when it holds
+    the archive (and no decompressed copy is wanted), otherwise streamed
+    from the archive and cached on the way.
+    """
+    cache = get_row_cache()
+    if sink is None:
+        entry = cache.get(archive_path)
+        if entry is not None:
+            return entry.rows
+    return cache.tee(archive_path, iter_log_rows(archive_path, sink=sink))
+
+
+def request_blocks(archive_path, request_ids):
+    """
+    { request_id: blocks } for those of request_ids with rows in
+    archive_path, read through its sidecar index.
+    """
+    index = get_index(archive_path)
+    blocks = {}
+    for rid in request_ids:
+        spans = index.spans_for_request(rid)
+        if spans:
+            blocks[rid] = index.read_spans(spans)
+    return blocks
+
+
+def resolve_archive(archive_path, ref_no, sink_path=None):
+    """
+    Answer steps 4-6 for one archive: from its sidecar index when fresh,
+    otherwise by scanning it once while building the index (and writing
+    the decompressed log to sink_path, if given). sink_path is only opened
+    for a scan, so an index hit leaves an existing file alone. Raw rows
+    are shared through the row cache either way.
+
+    Returns:
+        (ScanResult, served_from_index)
+    """
+    index = load_index(archive_path)
+    if index is not None:
+        return resolve_from_index(index, ref_no), True
+    builder = IndexBuilder()
+    if sink_path is None:
+        scan = scan_rows(builder.tee(_archive_rows(archive_path)), ref_no)
+    else:
+        with open(sink_path, 'wb') as sink:
+            scan = scan_rows(builder.tee(_archive_rows(archive_path, sink)), ref_no)
+    builder.save(archive_path)
+    return scan, False
+
+
+def resolve_archive_multi(archive_path, ref_nos):
+    """
+    Answer steps 4-6 for several Ref Nos in one archive: from its sidecar
+    index when fresh, otherwise with one streaming pass for all of them
+    while building the index.
+
+    Returns:
+        ({ ref_no: ScanResult }, served_from_index)
+    """
+    index = load_index(archive_path)
+    if index is not None:
+        return {ref_no: resolve_from_index(index, ref_no) for ref_no in ref_nos}, True
+    builder = IndexBuilder()
+    scans = scan_rows_multi(builder.tee(_archive_rows(archive_path)), ref_nos)
+    builder.save(archive_path)
+    return scans, False
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import json
+import os
+import string
+from datetime import timedelta
+
+# Path to log-location configuration
+LOG_CONFIG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'log-location.json')
+)
+
+# Placeholders a 'How to find' template may use
+TEMPLATE_FIELDS = ('year', 'month', 'date', 'hour')
+
+
+class LogLocation:
+    """
+    One log-location.json entry with its 'How to find' template pre-parsed.
+    live_path is the file currently being written (before rotation into the
+    hourly archives): the entry's 'Live file', or by default the template's
+    file name up to its first placeholder in the template's fixed leading
+    directory (.../integration/integration.log for the Integration log).
+    """
+    __slots__ = ('project', 'service', 'log_type', 'template', 'parts', 'live_path')
+
+    def __init__(self, project, service, log_type, template, live_path=None):
+        self.project = project
+        self.service = service
+        self.log_type = log_type
+        self.template = template
+        # [(literal, field or None), ...] as produced by string.Formatter
+        self.parts = []
+        for literal, field, _, _ in string.Formatter().parse(template):
+            if field is not None and field not in TEMPLATE_FIELDS:
+                raise ValueError(f"Unknown placeholder {{{field}}} in log template {template}")
+            self.parts.append((literal, field))
+        self.live_path = live_path or self._default_live_path()
+
+    def _default_live_path(self):
+        directory, name = os.path.split(self.template)
+        fixed = directory.split('{', 1)[0]
+        if '{' in directory:
+            fixed = os.path.dirname(fixed)
+        return os.path.join(fixed, name.split('{', 1)[0].rstrip('.-_'))
+
+    def path_for(self, dt):
+        """Concrete archive path for the hour containing dt."""
+        values = {
+            'year': f"{dt.year:04d}",
+            'month': f"{dt.month:02d}",
+            'date': f"{dt.day:02d}",
+            'hour': f"{dt.hour:02d}",
+        }
+        return ''.join(literal + (values[field] if field else '') for literal, field in self.parts)
+
+    def paths_for_range(self, start, end):
+        """Archive paths of every hour overlapping [start, end], in order."""
+        paths = []
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        while hour <= end:
+            paths.append(self.path_for(hour))
+            hour += timedelta(hours=1)
+        return paths
+
+
+class LogLocationRegistry:
+    """
+    log-location.json compiled into lookups keyed by (Project, Service, Log Type)
+    and (Project, Log Type). The file is re-read only when its mtime changes.
+    """
+
+    def __init__(self, config_path=LOG_CONFIG_PATH):
+        self.config_path = config_path
+        self.mtime = None
+        self.by_key = {}
+        self.by_project_type = {}
+        self.by_project = {}
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Re-compile the registry if the config file changed. Returns True on reload."""
+        mtime = os.stat(self.config_path).st_mtime
+        if mtime == self.mtime:
+            return False
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            cfg = json.load(f)
+
+        by_key, by_project_type, by_project = {}, {}, {}
+        for entry in cfg:
+            location = LogLocation(entry.get('Project'), entry.get('Service'),
+                                   entry.get('Log Type'), entry.get('How to find'), entry.get('Live file'))
+            by_key[(location.project, location.service, location.log_type)] = location
+            by_project_type.setdefault((location.project, location.log_type), []).append(location)
+            by_project.setdefault(location.project, []).append(location)
+        self.by_key, self.by_project_type, self.by_project = by_key, by_project_type, by_project
+        self.mtime = mtime
+        return True
+
+    def get(self, project, log_type, service=None):
+        """
+        Return the LogLocation for project & log_type (and service, if given).
+        Raises ValueError if none is configured.
+        """
+        self.reload_if_changed()
+        if service is not None:
+            location = self.by_key.get((project, service, log_type))
+        else:
+            matches = self.by_project_type.get((project, log_type))
+            location = matches[0] if matches else None
+        if location is None:
+            raise ValueError(f"No log configuration for project={project}, log_type={log_type}")
+        return location
+
+    def locations_for_project(self, project):
+        """Every configured log location of a project (all services and log types)."""
+        self.reload_if_changed()
+        return list(self.by_project.get(project, []))
+
+    def paths_for_range(self, project, log_type, start, end, service=None):
+        """Archive paths for project & log_type for every hour in [start, end]."""
+        return self.get(project, log_type, service).paths_for_range(start, end)
+
+
+# Registry shared by every lookup in the process
+_registry = None
+
+
+def get_registry():
+    """Return the process-wide LogLocationRegistry for LOG_CONFIG_PATH."""
+    global _registry
+    if _registry is None:
+        _registry = LogLocationRegistry()
+    return _registry
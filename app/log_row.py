@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import calendar
+import json
+import re
+import sys
+import zlib
+
+# Header tags of a <log-row> block, matched in any order
+HEADER_FIELD_PATTERN = re.compile(r'<(dateTime|request-id|threadName|logger|log-level)>([^<]*)</\1>')
+# Service invocation messages: kind line, Class, Method and the Response/Arguments label
+# (the payload itself runs from the end of the match to </log-message>)
+INVOCATION_MESSAGE_PATTERN = re.compile(
+    r'<log-message>\s*(Invoking Service|Service Invocation returned):\s*'
+    r'Class:\s*(\S+)\s*Method:\s*(\S+)\s*(Response:|Arguments:)?'
+)
+
+# LogRow.kind values
+KIND_INVOKE = 'invoke'
+KIND_RETURN = 'return'
+MESSAGE_KINDS = {'Invoking Service': KIND_INVOKE, 'Service Invocation returned': KIND_RETURN}
+
+# Payloads at least this long (characters) are kept zlib-compressed until read
+PAYLOAD_COMPRESS_MIN = 256
+
+# Marks a response that has not been parsed yet
+_UNPARSED = object()
+
+
+def timestamp_ms(date_time):
+    """
+    '2025-05-08/17:40:47.969/BDT' -> milliseconds since the epoch, taking
+    the wall-clock time as UTC (rows of one log share a zone, so ordering
+    and differences are preserved). Returns 0 if the value is malformed.
+    """
+    try:
+        seconds = calendar.timegm((int(date_time[0:4]), int(date_time[5:7]), int(date_time[8:10]),
+                                   int(date_time[11:13]), int(date_time[14:16]), int(date_time[17:19])))
+        return seconds * 1000 + int(date_time[20:23])
+    except (ValueError, IndexError):
+        return 0
+
+
+def datetime_ms(dt):
+    """A naive datetime on the same scale as LogRow.timestamp."""
+    return calendar.timegm(dt.timetuple()) * 1000 + dt.microsecond // 1000
+
+
+class LogRow:
+    """
+    Parsed form of one <log-row> block, without its raw text.
+
+    offset/length locate the block in the decompressed log so the original
+    text can still be read back (see log_stream.read_spans). Repeated names
+    (request-id, thread, logger, level, class, method) are interned,
+    timestamp is an int (see timestamp_ms), long Response/Arguments payloads
+    are stored compressed, and the Response JSON is only parsed on first
+    access to `response`.
+    """
+    __slots__ = ('offset', 'length', 'timestamp', 'request_id', 'thread', 'logger', 'level',
+                 'kind', 'class_name', 'method', '_payload', '_response')
+
+    def __init__(self, offset, length, timestamp, request_id, thread, logger, level,
+                 kind=None, class_name=None, method=None, payload=None):
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+        self.request_id = request_id
+        self.thread = thread
+        self.logger = logger
+        self.level = level
+        self.kind = kind
+        self.class_name = class_name
+        self.method = method
+        self.payload = payload
+        self._response = _UNPARSED
+
+    @property
+    def payload(self):
+        """Response (returned invocations) or Arguments (invocations) text, or None."""
+        if isinstance(self._payload, bytes):
+            return zlib.decompress(self._payload).decode('utf-8')
+        return self._payload
+
+    @payload.setter
+    def payload(self, value):
+        if value is not None and len(value) >= PAYLOAD_COMPRESS_MIN:
+            value = zlib.compress(value.encode('utf-8'), 1)
+        self._payload = value
+
+    @property
+    def response(self):
+        """The Response payload of a returned invocation as JSON, or None."""
+        if self._response is _UNPARSED:
+            self._response = None
+            payload = self.payload
+            if self.kind == KIND_RETURN and payload:
+                try:
+                    self._response = json.loads(payload)
+                except ValueError:
+                    pass
+        return self._response
+
+    def response_field(self, name):
+        """First value of key `name` anywhere in the Response JSON, or None."""
+        return self.response_fields((name,)).get(name)
+
+    def response_fields(self, names):
+        """
+        First value of each key in `names` anywhere in the Response JSON,
+        found with one walk. Returns { name: value } for the keys present.
+        """
+        found = {}
+        missing = set(names)
+        pending = [self.response]
+        while pending and missing:
+            value = pending.pop()
+            if isinstance(value, dict):
+                for name in missing.intersection(value):
+                    found[name] = value[name]
+                missing.difference_update(found)
+                pending.extend(reversed(list(value.values())))
+            elif isinstance(value, list):
+                pending.extend(reversed(value))
+        return found
+
+    def __repr__(self):
+        return (f"LogRow({self.timestamp}, {self.request_id!r}, {self.kind!r}, "
+                f"{self.class_name!r}, {self.method!r})")
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+def parse_block(block, offset=0, length=None):
+    """
+    Parse one <log-row> block into a LogRow.
+
+    Args:
+        block: The <log-row>...</log-row> text.
+        offset: Byte offset of the block in the decompressed log.
+        length: Byte length of the block (defaults to its UTF-8 length).
+    """
+    if length is None:
+        length = len(block.encode('utf-8'))
+    header = {}
+    message_start = block.find('<log-message>')
+    for m in HEADER_FIELD_PATTERN.finditer(block, 0, message_start if message_start >= 0 else len(block)):
+        header.setdefault(m.group(1), m.group(2))
+    row = LogRow(
+        offset, length,
+        timestamp_ms(header.get('dateTime', '')),
+        _intern(header.get('request-id')),
+        _intern(header.get('threadName')),
+        _intern(header.get('logger')),
+        _intern(header.get('log-level')),
+    )
+    if message_start >= 0:
+        m = INVOCATION_MESSAGE_PATTERN.match(block, message_start)
+        if m:
+            row.kind = MESSAGE_KINDS[m.group(1)]
+            row.class_name = sys.intern(m.group(2))
+            row.method = sys.intern(m.group(3))
+            if m.group(4):
+                end = block.rfind('</log-message>')
+                row.payload = block[m.end():end if end >= 0 else len(block)].strip()
+    return row
+
+
+def parse_rows(rows):
+    """Parse (offset, length, block) tuples into a list of LogRows."""
+    return [parse_block(block, offset, length) for offset, length, block in rows]
+
+
+def filter_rows(records, request_id=None, kind=None, class_name=None, method=None,
+                level=None, start=None, end=None):
+    """
+    Yield the LogRows matching every given criterion. start/end bound
+    LogRow.timestamp inclusively and may be ints or naive datetimes; class
+    names match on either the full name or its last component.
+    """
+    if start is not None and not isinstance(start, int):
+        start = datetime_ms(start)
+    if end is not None and not isinstance(end, int):
+        end = datetime_ms(end)
+    for row in records:
+        if request_id is not None and row.request_id != request_id:
+            continue
+        if kind is not None and row.kind != kind:
+            continue
+        if method is not None and row.method != method:
+            continue
+        if level is not None and row.level != level:
+            continue
+        if start is not None and row.timestamp < start:
+            continue
+        if end is not None and row.timestamp > end:
+            continue
+        if class_name is not None and row.class_name != class_name and \
+                (row.class_name or '').rsplit('.', 1)[-1] != class_name:
+            continue
+        yield row
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+import heapq
+import lzma
+import re
+from collections import OrderedDict
+
+import triage_metrics
+from bot_resolver_step6 import evaluate_blocks
+from mmap_scan import LOG_ROW_BYTES_PATTERN, iter_block_spans, open_log_map
+from xz_seek import SeekableXZ
+
+# Pattern to extract request-id from a log-row block
+REQUEST_ID_PATTERN = re.compile(r'<request-id>([^<]+)</request-id>', re.IGNORECASE)
+# ExtID / Ref No values embedded in log messages, either as JSON
+# ("ExtID":"IBP...") or XML (<ExtID>IBP...</ExtID>)
+EXT_ID_PATTERN = re.compile(
+    r'(?:ExtID|RefNo|Ref_No|ReferenceNo)"?\s*[:>]\s*"?([A-Za-z0-9_-]+)', re.IGNORECASE
+)
+# Pattern to extract the row timestamp (2025-05-08/17:40:47.969/BDT sorts lexically)
+DATETIME_PATTERN = re.compile(r'<dateTime>([^<]+)</dateTime>', re.IGNORECASE)
+
+# Size of compressed chunks fed to the decompressor
+READ_CHUNK_SIZE = 1024 * 1024
+# Number of recent request-ids whose blocks are kept while scanning
+REQUEST_WINDOW = 1024
+
+
+def iter_decompressed(src, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield decompressed byte chunks from an open .xz file object.
+    Handles concatenated streams and the null padding allowed between them.
+    """
+    decompressor = lzma.LZMADecompressor()
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        triage_metrics.add('bytesRead', len(chunk))
+        while chunk:
+            if decompressor.eof:
+                chunk = chunk.lstrip(b'\x00')
+                if not chunk:
+                    break
+                decompressor = lzma.LZMADecompressor()
+            data = decompressor.decompress(chunk)
+            chunk = decompressor.unused_data if decompressor.eof else b''
+            if data:
+                triage_metrics.add('bytesDecompressed', len(data))
+                yield data
+
+
+def iter_log_rows(archive_path, chunk_size=READ_CHUNK_SIZE, sink=None):
+    """
+    Incrementally decompress an .xz archive and yield its <log-row> blocks.
+
+    Only one compressed chunk and the unfinished tail of the decompressed
+    text are held in memory at a time.
+
+    Args:
+        archive_path: Path to the .xz log archive.
+        chunk_size: Number of compressed bytes to read per iteration.
+        sink: Optional binary file object that receives the decompressed
+              bytes as they are produced (used to materialize step 3).
+
+    Yields:
+        (offset, length, block) where offset and length locate the block in
+        the decompressed log (in bytes) and block is the decoded
+        <log-row>...</log-row> text.
+    """
+    with open(archive_path, 'rb') as src:
+        yield from iter_chunk_rows(iter_decompressed(src, chunk_size), sink=sink)
+
+
+def iter_chunk_rows(chunks, sink=None):
+    """
+    Split a stream of decompressed byte chunks into (offset, length, block)
+    tuples, carrying incomplete blocks over to the next chunk.
+    """
+    buffer = b''
+    buffer_offset = 0
+    for data in chunks:
+        if sink is not None:
+            sink.write(data)
+        buffer += data
+        end = 0
+        rows = 0
+        for m in LOG_ROW_BYTES_PATTERN.finditer(buffer):
+            raw = m.group(0)
+            yield buffer_offset + m.start(), len(raw), raw.decode('utf-8', errors='replace')
+            end = m.end()
+            rows += 1
+        triage_metrics.add('rowsScanned', rows)
+        buffer = buffer[end:]
+        buffer_offset += end
+
+
+def read_spans(archive_path, spans, chunk_size=READ_CHUNK_SIZE):
+    """
+    Read the given (offset, length) spans of the decompressed log from an
+    .xz archive. Multi-block archives (see xz_seek.repack_archive) only have
+    the blocks covering the spans decompressed; single-block archives are
+    decompressed up to the end of the last span.
+
+    Returns:
+        List of decoded blocks in the order of the sorted spans.
+    """
+    spans = sorted(spans)
+    if not spans:
+        return []
+    seekable = SeekableXZ(archive_path)
+    if len(seekable.blocks) > 1:
+        return [seekable.read(offset, length).decode('utf-8', errors='replace')
+                for offset, length in spans]
+
+    blocks = []
+    pos = 0
+    buffer = b''
+    i = 0
+    with open(archive_path, 'rb') as src:
+        for data in iter_decompressed(src, chunk_size):
+            buffer += data
+            while i < len(spans):
+                offset, length = spans[i]
+                if offset + length > pos + len(buffer):
+                    break
+                start = offset - pos
+                blocks.append(buffer[start:start + length].decode('utf-8', errors='replace'))
+                i += 1
+            if i == len(spans):
+                break
+            # Keep only what the next span still needs
+            keep_from = max(0, min(spans[i][0] - pos, len(buffer)))
+            buffer = buffer[keep_from:]
+            pos += keep_from
+    return blocks
+
+
+def iter_log_file_rows(log_file_path):
+    """
+    Yield (offset, length, block) tuples from an already decompressed log
+    file, memory-mapping it instead of loading it whole.
+    """
+    with open_log_map(log_file_path) as mm:
+        for start, end in iter_block_spans(mm):
+            yield start, end - start, mm[start:end].decode('utf-8', errors='replace')
+
+
+class ScanResult:
+    def __init__(self, ref_no: str):
+        self.ref_no = ref_no
+        self.request_ids = []
+        self.blocks = {}
+        self.verdict = None
+        self.rows_scanned = 0
+
+    def blocks_for(self, request_id):
+        return self.blocks.get(request_id, [])
+
+    def to_dict(self):
+        return {
+            'ref_no': self.ref_no,
+            'request_ids': self.request_ids,
+            'blocks': self.blocks,
+            'verdict': self.verdict,
+            'rows_scanned': self.rows_scanned,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls(data['ref_no'])
+        result.request_ids = data['request_ids']
+        result.blocks = data['blocks']
+        result.verdict = data['verdict']
+        result.rows_scanned = data['rows_scanned']
+        return result
+
+    def evaluate(self):
+        """Step 6: the first AuthRespCode verdict among the found request-ids."""
+        self.verdict = None
+        for rid in self.request_ids:
+            self.verdict = evaluate_blocks(rid, self.blocks[rid])
+            if self.verdict['code'] is not None:
+                break
+        if self.verdict is None:
+            self.verdict = {
+                'code': None,
+                'success': False,
+                'message': f"No request-id found for ref {self.ref_no}",
+            }
+        return self.verdict
+
+
+def block_ext_ids(block):
+    """
+    The ExtID / Ref No values a block carries. A block matches a Ref No
+    when it is one of these: the rule shared by streaming scans, the
+    sidecar index and the live-log index.
+    """
+    return set(EXT_ID_PATTERN.findall(block))
+
+
+def row_timestamp(block):
+    """Sort key for a <log-row> block: its <dateTime> text, or '' if missing."""
+    m = DATETIME_PATTERN.search(block)
+    return m.group(1) if m else ''
+
+
+def merge_scan_results(results, ref_no):
+    """
+    Merge per-archive ScanResults for the same ref_no into one, with each
+    request-id's blocks merged in timestamp order and request-ids ordered
+    by their first block.
+    """
+    merged = ScanResult(ref_no)
+    per_request = {}
+    for result in results:
+        merged.rows_scanned += result.rows_scanned
+        for rid in result.request_ids:
+            per_request.setdefault(rid, []).append(result.blocks_for(rid))
+    for rid, block_lists in per_request.items():
+        merged.blocks[rid] = list(heapq.merge(*block_lists, key=row_timestamp))
+    merged.request_ids = sorted(per_request, key=lambda rid: row_timestamp(merged.blocks[rid][0]))
+    merged.evaluate()
+    return merged
+
+
+def compile_needles(needles):
+    """
+    One compiled pattern matching any of the needles, longest first, so a
+    block is searched once however many tickets are being resolved.
+    """
+    ordered = sorted(set(needles), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(needle) for needle in ordered))
+
+
+def scan_rows_multi(rows, ref_nos, window=REQUEST_WINDOW):
+    """
+    Answer steps 4-6 for several Ref Nos in a single pass over an iterable of
+    (offset, length, block) rows.
+
+    Every block is searched once with one pattern built from all Ref Nos;
+    a block it hits is credited to each Ref No among its ExtID values.
+    Blocks of the most recent `window` request-ids are kept in a bounded
+    buffer so that rows logged before the one carrying a Ref No (e.g. the
+    'Invoking Service' row) are still collected once the request-id is
+    identified; older request-ids are dropped, keeping memory flat.
+
+    Returns:
+        { ref_no: ScanResult } with the request-ids (step 4), their blocks
+        (step 5) and the AuthRespCode verdict (step 6) for each Ref No.
+    """
+    results = {ref_no: ScanResult(ref_no) for ref_no in ref_nos}
+    matcher = compile_needles(results)
+    owners = {}
+    recent = OrderedDict()
+    rows_scanned = 0
+    for _, _, block in rows:
+        rows_scanned += 1
+        m = REQUEST_ID_PATTERN.search(block)
+        if not m:
+            continue
+        rid = m.group(1)
+
+        if rid in owners:
+            for ref_no in owners[rid]:
+                results[ref_no].blocks[rid].append(block)
+            continue
+
+        pending = recent.pop(rid, None)
+        if pending is None:
+            pending = []
+        pending.append(block)
+
+        # The pattern only finds blocks worth testing; a block is then credited
+        # to each Ref No among its ExtID values (see block_ext_ids)
+        hits = [ref_no for ref_no in block_ext_ids(block) if ref_no in results] if matcher.search(block) else None
+        if hits:
+            owners[rid] = hits
+            for ref_no in hits:
+                results[ref_no].request_ids.append(rid)
+                results[ref_no].blocks[rid] = list(pending)
+            continue
+
+        recent[rid] = pending
+        if len(recent) > window:
+            recent.popitem(last=False)
+
+    for result in results.values():
+        result.rows_scanned = rows_scanned
+        result.evaluate()
+    return results
+
+
+def scan_rows(rows, ref_no, window=REQUEST_WINDOW):
+    """
+    Answer steps 4-6 for one Ref No in a single pass over an iterable of
+    (offset, length, block) rows; see scan_rows_multi.
+
+    Returns:
+        ScanResult with the request-ids (step 4), their blocks (step 5)
+        and the AuthRespCode verdict (step 6).
+    """
+    return scan_rows_multi(rows, [ref_no], window=window)[ref_no]
+
+
+def scan_archive(archive_path, ref_no, window=REQUEST_WINDOW, sink=None):
+    """
+    Stream an .xz archive once and resolve ref_no to request-ids, their
+    <log-row> blocks and the AuthRespCode verdict.
+    """
+    return scan_rows(iter_log_rows(archive_path, sink=sink), ref_no, window=window)
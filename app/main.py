@@ -1,38 +1,257 @@
 #!/usr/bin/env python3
+import argparse
+import glob
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-from app.gather_context import gather_context
+from gather_context import gather_context
 from ticket_reader import read_and_reply
-from kb_searcher import search_kb
-from bot_resolver import resolve_ticket
+from kb_searcher import search_kb, get_kb_index, REPORT_FOLDER_NAME
+from bot_resolver import release_ticket_artifacts, resolve_ticket, resolve_tickets
+from log_registry import get_registry
+from request_trace import step4_request_ids, trace_ticket
+from result_store import ResultStore, set_resolver, ticket_record
+from row_cache import set_row_cache_budget
 from stack_finder import find_stack
+from triage_metrics import (METRICS_PATH, PROFILE_FOLDER_NAME, finish_ticket, keep_slowest_profiles, profiled,
+                            stage, start_ticket)
 
 
-def main():
-    # Hardcoded ticket filename (change as needed)
+def process_ticket(ticket_filename, project="MMBL", scan_workers=None, resolve=True,
+                   metrics_path=METRICS_PATH, profile_dir=None, store=None, write_files=True):
+    """
+    Run the full triage pipeline for one ticket and return a summary dict:
+      { 'ticket', 'kbMatch', 'reportId', 'stack', 'verdict', 'error', 'contextPath',
+        'totalMs', 'profile' }
+    With resolve=False, KB-matched tickets are left for a grouped resolver
+    pass (see bot_resolver.resolve_tickets).
+    Per-stage timings and counters are appended to metrics_path as one JSON
+    line (see triage_metrics); with profile_dir, the ticket is also run
+    under cProfile and its stats dumped to profile_dir/<ticket>.prof.
+    With a result_store.ResultStore as `store`, the ticket's context, reply,
+    KB match, classification and resolver outputs are put into it as one
+    record; write_files=False skips the per-ticket output files.
+    """
+    summary, record = _run_ticket(ticket_filename, project, scan_workers, resolve, metrics_path,
+                                  profile_dir, write_files)
+    if store is not None:
+        store.put(record)
+    return summary
+
+
+def _run_ticket(ticket_filename, project, scan_workers, resolve, metrics_path, profile_dir, write_files):
+    base = os.path.splitext(os.path.basename(ticket_filename))[0]
+    profile_path = os.path.join(profile_dir, f"{base}.prof") if profile_dir else None
+    start_ticket(base)
+    try:
+        with profiled(profile_path):
+            summary, record = _triage(ticket_filename, base, project, scan_workers, resolve, write_files)
+    finally:
+        metrics = finish_ticket(metrics_path)
+    summary['totalMs'] = metrics['totalMs']
+    summary['profile'] = profile_path
+    return summary, record
+
+
+def _triage(ticket_filename, base, project, scan_workers, resolve, write_files):
     base_dir = os.path.dirname(__file__)
     tickets_dir = os.path.join(base_dir, '..', 'tickets')
+    ticket_path = os.path.join(tickets_dir, ticket_filename)
+    summary = {'ticket': base, 'kbMatch': False, 'reportId': '', 'stack': None, 'verdict': None, 'error': None}
 
-    ticket_filename = "ticket_0007.txt"
-    ticket_path = os.path.join(base_dir, ticket_filename)
     # 1. Generate context and reply files
-    read_and_reply(ticket_filename)
-    gather_context(ticket_filename, "MMBL")
-    # 2. Build absolute path to the generated context file
-    base_dir = os.path.dirname(__file__)
-    base = os.path.splitext(ticket_filename)[0]
+    with stage('read_and_reply'):
+        reply = read_and_reply(ticket_filename, write=write_files)
+    with stage('gather_context'):
+        context = gather_context(ticket_filename, project, write=write_files)
+    # 2. Build absolute path to the generated context file (later stages use the
+    #    returned record rather than reading it back)
     context_path = os.path.normpath(os.path.join(base_dir, '..', 'contexts', f"{base}_context.txt"))
-    # find_stack(context_path, ticket_path)
+    summary['contextPath'] = context_path
     # 3. Search the knowledge base using correct path
-    result = search_kb(context_path)
+    kb = resolved = None
+    try:
+        with stage('search_kb'):
+            kb = result = search_kb(context_path, context=context, write=write_files)
+    except ValueError as e:
+        result = {'isMatchFound': False, 'reportId': ''}
+        summary['error'] = str(e)
     if result.get('isMatchFound'):
         report_id = result.get('reportId', '')
+        summary['kbMatch'] = True
+        summary['reportId'] = report_id
         print(f"Match found in KB with report ID: {report_id}")
         # Proceed to resolution workflow
-        resolve_ticket(context_path,report_id)
+        if resolve:
+            try:
+                with stage('resolve_ticket'):
+                    resolved = resolve_ticket(context_path, report_id, max_workers=scan_workers,
+                                              context=context, write_files=write_files)
+                summary['verdict'] = resolved['verdict']['message']
+            except (ValueError, FileNotFoundError) as e:
+                summary['error'] = str(e)
+            finally:
+                # Drop the ticket's references on shared step 3 logs
+                release_ticket_artifacts(context_path)
     else:
         print("No match found in KB, delegating to stack finder...")
-        find_stack(context_path, ticket_path)
+        with stage('find_stack'):
+            summary['stack'] = find_stack(context_path, ticket_path, context=context, write=write_files)
+    return summary, ticket_record(context, reply, kb, summary['stack'], resolved, summary)
+
+
+def _init_worker(row_cache_mb=None):
+    """
+    Batch worker initializer. Importing this module already loaded the spaCy
+    model (gather_context); build the KB index and log-location registry once
+    as well, so every ticket in the worker reuses them. row_cache_mb sets the
+    memory budget of the worker's row cache.
+    """
+    base_dir = os.path.dirname(__file__)
+    report_dir = os.path.abspath(os.path.join(base_dir, '..', REPORT_FOLDER_NAME))
+    get_kb_index(report_dir)
+    get_registry()
+    if row_cache_mb is not None:
+        set_row_cache_budget(row_cache_mb)
+
+
+def _process_in_worker(ticket_path, project, resolve=True, profile_dir=None, keep_record=False, write_files=True):
+    try:
+        summary, record = _run_ticket(ticket_path, project, 1, resolve, METRICS_PATH, profile_dir, write_files)
+        return summary, record if keep_record else None
+    except Exception as e:
+        base = os.path.splitext(os.path.basename(ticket_path))[0]
+        return {'ticket': base, 'kbMatch': False, 'reportId': '', 'stack': None,
+                'verdict': None, 'error': f"{type(e).__name__}: {e}"}, None
+
+
+def collect_tickets(pattern):
+    """Expand a tickets directory or glob into a sorted list of absolute ticket paths."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.txt')
+    return sorted(os.path.abspath(p) for p in glob.glob(pattern) if os.path.isfile(p))
+
+
+def run_batch(pattern, project="MMBL", workers=None, summary_path=None, grouped=False,
+              row_cache_mb=None, profile_slowest=0, store=None, write_files=True):
+    """
+    Process every ticket matching `pattern` across a pool of worker processes.
+    Each worker loads the NER model, KB reports and log config once and
+    reuses them for all of its tickets. With grouped=True, KB-matched tickets
+    are resolved afterwards with one pass per archive for all of them.
+    With profile_slowest=N, every ticket is profiled and the profiles of the
+    N slowest are kept under ../metrics/profiles.
+    With `store`, every ticket's record is put into the result store by this
+    process once the batch (and the grouped pass) is done; write_files=False
+    skips the per-ticket output files.
+    Returns the list of per-ticket summaries, in ticket order.
+    """
+    tickets = collect_tickets(pattern)
+    if not tickets:
+        print(f"No tickets found for {pattern}")
+        return []
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tickets) // (workers * 4))
+    profile_dir = None
+    if profile_slowest:
+        profile_dir = os.path.join(os.path.dirname(METRICS_PATH), PROFILE_FOLDER_NAME)
+    # Records are needed for the store, and for the grouped pass when no context file was written
+    keep_records = store is not None or not write_files
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(row_cache_mb,)) as pool:
+        results = list(pool.map(_process_in_worker, tickets, [project] * len(tickets),
+                                [not grouped] * len(tickets), [profile_dir] * len(tickets),
+                                [keep_records] * len(tickets), [write_files] * len(tickets),
+                                chunksize=chunksize))
+    summaries = [summary for summary, _ in results]
+    records = {summary['ticket']: record for summary, record in results if record is not None}
+    if profile_slowest:
+        for path in keep_slowest_profiles(summaries, profile_slowest):
+            print(f"Profile kept: {path}")
+
+    if grouped:
+        pending = [s for s in summaries if s['kbMatch'] and s['verdict'] is None and not s['error']]
+        contexts = {s['contextPath']: records[s['ticket']]['context'] for s in pending if s['ticket'] in records}
+        resolved = resolve_tickets([s['contextPath'] for s in pending], max_workers=workers,
+                                   write_files=write_files, contexts=contexts)
+        for summary in pending:
+            outcome = resolved[summary['contextPath']]
+            if 'error' in outcome:
+                summary['error'] = outcome['error']
+            else:
+                summary['verdict'] = outcome['verdict']['message']
+            if summary['ticket'] in records:
+                set_resolver(records[summary['ticket']], outcome)
+
+    if store is not None:
+        for summary in summaries:
+            record = records.get(summary['ticket'])
+            if record is not None:
+                record['summary'] = summary
+                store.put(record)
+        store.flush()
+        print(f"{len(records)} ticket records stored in {store.path}")
+
+    for summary in summaries:
+        print(json.dumps(summary))
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as out:
+            for summary in summaries:
+                out.write(json.dumps(summary) + "\n")
+        print(f"Batch summary written to {summary_path}")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Triage support tickets")
+    parser.add_argument('ticket', nargs='?', default="ticket_0007.txt",
+                        help="ticket file name under ../tickets")
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB',
+                        help="process every ticket in a directory or matching a glob")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="batch worker processes (default: CPU count)")
+    parser.add_argument('--project', default="MMBL")
+    parser.add_argument('--summary', metavar='PATH',
+                        help="write the batch summary as JSON lines to PATH")
+    parser.add_argument('--grouped', action='store_true',
+                        help="in batch mode, resolve all matched tickets with one pass per archive")
+    parser.add_argument('--row-cache-mb', type=float, default=None,
+                        help="memory budget per worker for cached log rows")
+    parser.add_argument('--profile-slowest', type=int, default=0, metavar='N',
+                        help="cProfile tickets and keep the profiles of the N slowest")
+    parser.add_argument('--trace', action='store_true',
+                        help="after resolving, trace the ticket's request-ids across every log type")
+    parser.add_argument('--store', action='store_true',
+                        help="record each ticket's results in the result store (../results/triage.db)")
+    parser.add_argument('--no-files', action='store_true',
+                        help="skip the per-ticket output files (implies --store; see result_store.py --export)")
+    args = parser.parse_args()
+
+    write_files = not args.no_files
+    store = ResultStore() if args.store or args.no_files else None
+    try:
+        if args.batch:
+            run_batch(args.batch, args.project, args.workers, args.summary, args.grouped,
+                      args.row_cache_mb, args.profile_slowest, store, write_files)
+        else:
+            profile_dir = None
+            if args.profile_slowest:
+                profile_dir = os.path.join(os.path.dirname(METRICS_PATH), PROFILE_FOLDER_NAME)
+            summary = process_ticket(args.ticket, args.project, profile_dir=profile_dir,
+                                     store=store, write_files=write_files)
+            if args.trace and summary['verdict'] is not None:
+                if write_files:
+                    trace_ticket(summary['contextPath'])
+                else:
+                    record = store.get(summary['ticket'])
+                    trace_ticket(summary['contextPath'],
+                                 step4_request_ids(record['resolver']['outputs']['step_4.txt']),
+                                 context_text=record['context'])
+    finally:
+        if store is not None:
+            store.close()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import mmap
+import os
+import re
+from contextlib import contextmanager
+
+import triage_metrics
+
+# <log-row> block delimiters in the decompressed log
+LOG_ROW_START = b'<log-row>'
+LOG_ROW_END = b'</log-row>'
+# Shared with log_stream, so every path splits a log into the same blocks
+LOG_ROW_BYTES_PATTERN = re.compile(rb'<log-row>.*?</log-row>', re.DOTALL | re.IGNORECASE)
+REQUEST_ID_BYTES_PATTERN = re.compile(rb'<request-id>([^<]+)</request-id>', re.IGNORECASE)
+
+
+@contextmanager
+def open_log_map(log_file_path):
+    """
+    Memory-map a decompressed log read-only. Yields b'' for an empty file,
+    which mmap cannot map.
+    """
+    if not os.path.isfile(log_file_path):
+        raise FileNotFoundError(f"Log file not found: {log_file_path}")
+    with open(log_file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            yield b''
+            return
+        triage_metrics.add('bytesRead', size)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+
+def iter_block_spans(mm):
+    """Lazily yield (start, end) byte offsets of every <log-row> block."""
+    for m in LOG_ROW_BYTES_PATTERN.finditer(mm):
+        yield m.start(), m.end()
+
+
+def iter_needle_blocks(mm, needle):
+    """
+    Yield (start, end) of each <log-row> block containing needle. The needle
+    is searched first with a compiled bytes pattern; only then is the
+    enclosing block located, so non-matching blocks are never extracted.
+    """
+    pattern = re.compile(re.escape(needle))
+    pos = 0
+    while True:
+        m = pattern.search(mm, pos)
+        if not m:
+            return
+        start = mm.rfind(LOG_ROW_START, 0, m.start())
+        end = mm.find(LOG_ROW_END, m.end())
+        if start < 0 or end < 0:
+            pos = m.end()
+            continue
+        # The needle must sit inside this block, not after an earlier block's end
+        if mm.rfind(LOG_ROW_END, start, m.start()) >= 0:
+            pos = m.end()
+            continue
+        end += len(LOG_ROW_END)
+        yield start, end
+        pos = end
+
+
+def find_request_ids(log_file_path, ref_no, accept=None):
+    """
+    Request-ids of the <log-row> blocks containing ref_no, in log order.
+    With accept, only blocks whose decoded text it returns True for count.
+    """
+    found = []
+    with open_log_map(log_file_path) as mm:
+        for start, end in iter_needle_blocks(mm, ref_no.encode('utf-8')):
+            if accept is not None and not accept(mm[start:end].decode('utf-8', errors='replace')):
+                continue
+            m = REQUEST_ID_BYTES_PATTERN.search(mm, start, end)
+            if m:
+                rid = m.group(1).decode('utf-8', errors='replace')
+                if rid not in found:
+                    found.append(rid)
+    return found
+
+
+def find_request_blocks(log_file_path, request_id):
+    """Decoded <log-row> blocks tagged with request_id, in log order."""
+    needle = f'<request-id>{request_id}</request-id>'.encode('utf-8')
+    with open_log_map(log_file_path) as mm:
+        return [mm[start:end].decode('utf-8', errors='replace')
+                for start, end in iter_needle_blocks(mm, needle)]
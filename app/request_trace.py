@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import argparse
+import heapq
+import os
+import queue
+import re
+import threading
+from datetime import datetime, timedelta
+
+from archive_fetcher import get_fetcher
+from bot_resolver import DT_FORMAT, SEARCH_WINDOW_MINUTES, _output_dir, parse_context, parse_context_text
+from log_registry import get_registry
+from log_row import timestamp_ms
+from log_stream import DATETIME_PATTERN, iter_decompressed
+from mmap_scan import LOG_ROW_END, LOG_ROW_START
+
+# Trace output, next to the ticket's other resolver outputs
+TRACE_FILE_FORMAT = "{ticket}_trace.log"
+# Matching rows read ahead per log source while the merge waits on the others
+TRACE_QUEUE_SIZE = 256
+
+# Ends a prefetched source
+_DONE = object()
+
+
+def trace_sources(project, dt, window_minutes, archive_dir):
+    """
+    Every configured log of the project (all services and log types) with
+    its archives overlapping [dt - window_minutes, dt + window_minutes],
+    fetched through the archive fetcher for archive_dir.
+
+    Returns:
+        [(label, [archive_path, ...]), ...] with label 'Service/Log Type' and
+        each source's local archives in hour order. Hours the fetcher does
+        not have are skipped; sources without any archive are left out.
+    """
+    start = dt - timedelta(minutes=window_minutes)
+    end = dt + timedelta(minutes=window_minutes)
+    fetcher = get_fetcher(archive_dir)
+    windows = [(location, location.paths_for_range(start, end))
+               for location in get_registry().locations_for_project(project)]
+    fetcher.prefetch(path for _, paths in windows for path in paths)
+    sources = []
+    for location, paths in windows:
+        archives = []
+        for path in paths:
+            try:
+                archives.append(fetcher.fetch(path))
+            except FileNotFoundError:
+                continue
+        if archives:
+            sources.append((f"{location.service}/{location.log_type}", archives))
+    return sources
+
+
+def iter_source_rows(label, archive_paths, request_ids):
+    """
+    Stream the <log-row> blocks of the given request-ids from a source's
+    hourly archives, in log order. The decompressed text is searched for the
+    request-id tags directly and only matching blocks are cut out and
+    decoded, so the rest of the log is never split into rows.
+
+    Yields:
+        (timestamp, label, block) with timestamp as in log_row.timestamp_ms.
+    """
+    needles = re.compile(b'|'.join(re.escape(f'<request-id>{rid}</request-id>'.encode('utf-8'))
+                                   for rid in request_ids))
+    for archive_path in archive_paths:
+        with open(archive_path, 'rb') as src:
+            buffer = b''
+            for data in iter_decompressed(src):
+                buffer += data
+                pos = 0
+                while True:
+                    m = needles.search(buffer, pos)
+                    start = buffer.rfind(LOG_ROW_START, pos, m.start()) if m else -1
+                    end = buffer.find(LOG_ROW_END, m.end()) if m else -1
+                    if start < 0 or end < 0:
+                        break
+                    end += len(LOG_ROW_END)
+                    block = buffer[start:end].decode('utf-8', errors='replace')
+                    dt = DATETIME_PATTERN.search(block)
+                    yield timestamp_ms(dt.group(1) if dt else ''), label, block
+                    pos = end
+                # Carry over the unfinished block (or a '<log-row>' cut in half)
+                keep = buffer.rfind(LOG_ROW_START, pos)
+                if keep < 0:
+                    keep = max(pos, len(buffer) - len(LOG_ROW_START) + 1)
+                buffer = buffer[keep:]
+
+
+def _prefetch(rows, queue_size=TRACE_QUEUE_SIZE):
+    """
+    Run the rows iterator on a background thread, handing its items over
+    through a bounded queue. Decompression releases the GIL, so several
+    prefetched sources are scanned at the same time. Closing the returned
+    generator stops the thread at its next item.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has gone, rather than block on a full queue
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for row in rows:
+                if not put(row):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def trace_request(request_ids, project, dt, window_minutes=SEARCH_WINDOW_MINUTES, archive_dir=None):
+    """
+    Follow request-ids through every log the project has configured.
+
+    Each source is streamed from its archives on its own thread and the
+    sources are combined with a heap-based k-way merge, so rows come out in
+    timestamp order as soon as every source has produced its first match (or
+    finished); nothing is decompressed or held in full.
+
+    Args:
+        request_ids: Request-ids to follow (e.g. the step 4 output).
+        project: Project whose log-location entries are traced.
+        dt: Naive datetime the search window is centred on.
+        window_minutes: Minutes searched either side of dt.
+        archive_dir: Folder holding the archives (by file name).
+
+    Yields:
+        (timestamp, label, block) tuples in timestamp order, rows with equal
+        timestamps in source order.
+    """
+    sources = trace_sources(project, dt, window_minutes, archive_dir)
+    streams = [_prefetch(iter_source_rows(label, paths, request_ids)) for label, paths in sources]
+    try:
+        yield from heapq.merge(*streams, key=lambda row: row[0])
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def step4_request_ids(text):
+    """The request-ids listed in a step 4 output."""
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.startswith('No request-id')]
+
+
+def trace_ticket(context_path, request_ids=None, window_minutes=SEARCH_WINDOW_MINUTES, context_text=None):
+    """
+    Write the cross-log trace of a resolved ticket to
+    bot-resolve/{ticket_name}_trace.log, one '# label' header line followed
+    by the block for every row.
+    request_ids default to the ticket's step 4 output (see resolve_ticket).
+    Pass context_text when the context file was not written.
+    Returns (trace_path, rows written).
+    """
+    if context_text is not None:
+        project, _, dt_str = parse_context_text(context_text, context_path)
+    else:
+        project, _, dt_str = parse_context(context_path)
+    dt = datetime.strptime(dt_str, DT_FORMAT)
+    output_dir = _output_dir(context_path)
+    ticket_name = os.path.splitext(os.path.basename(context_path))[0]
+    if request_ids is None:
+        step4_path = os.path.join(output_dir, f"{ticket_name}_step_4.txt")
+        with open(step4_path, 'r', encoding='utf-8') as f:
+            request_ids = step4_request_ids(f.read())
+    archive_dir = os.path.abspath(os.path.join(os.path.dirname(context_path), os.pardir, 'log-files'))
+
+    os.makedirs(output_dir, exist_ok=True)
+    trace_path = os.path.join(output_dir, TRACE_FILE_FORMAT.format(ticket=ticket_name))
+    count = 0
+    with open(trace_path, 'w', encoding='utf-8') as out:
+        if request_ids:
+            for _, label, block in trace_request(request_ids, project, dt, window_minutes, archive_dir):
+                out.write(f"# {label}\n{block}\n")
+                count += 1
+    print(f"Trace of {len(request_ids)} request-id(s): {count} rows at {trace_path}")
+    return trace_path, count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Trace a ticket's request-ids across every log type")
+    parser.add_argument('context', help="ticket context file (resolved, unless --request-id is given)")
+    parser.add_argument('--request-id', action='append', dest='request_ids',
+                        help="request-id to trace (repeatable; default: the ticket's step 4 output)")
+    parser.add_argument('--window', type=int, default=SEARCH_WINDOW_MINUTES,
+                        help="minutes searched either side of the ticket's Date/Time")
+    args = parser.parse_args()
+    trace_ticket(args.context, args.request_ids, args.window)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from bot_resolver import BOT_RESOLVE_FOLDER_NAME
+from kb_searcher import RESULT_FOLDER_NAME, result_text
+from stack_finder import STACK_FOUND_FOLDER, classification_text
+
+# Triage results of every ticket, one record each
+RESULT_STORE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'results', 'triage.db')
+)
+# Records buffered by put before they are written in one transaction
+STORE_BATCH_SIZE = 100
+# Seconds a writer waits for another process's transaction to finish
+STORE_BUSY_TIMEOUT = 30
+# Bumped when the table layout changes; older stores are rebuilt
+STORE_SCHEMA_VERSION = 1
+
+# Folders of the per-ticket file layout reproduced by export
+REPLIES_FOLDER_NAME = 'replies'
+CONTEXTS_FOLDER_NAME = 'contexts'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket      TEXT PRIMARY KEY,
+    ext_id      TEXT,
+    ticket_date TEXT,
+    updated_at  TEXT NOT NULL,
+    record      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_ext_id ON tickets (ext_id);
+CREATE INDEX IF NOT EXISTS tickets_date ON tickets (ticket_date);
+"""
+
+
+def ticket_record(context, reply, kb=None, stack=None, resolved=None, summary=None):
+    """
+    Build the stored record of one triaged ticket.
+
+    Args:
+        context: The ticket's gather_context.Context.
+        reply: Acknowledgment text (ticket_reader.read_and_reply).
+        kb: search_kb result dict, or None if the search failed.
+        stack: stack_finder category, for tickets without a KB match.
+        resolved: resolve_ticket result (or resolve_tickets entry), for KB-matched tickets.
+        summary: main.process_ticket summary dict.
+
+    Returns:
+        dict with 'ticket', 'extId', 'date' ('YYYY-MM-DD' of the ticket's
+        Date/Time, or None), 'context' (the context file text), 'reply',
+        'kb', 'stack', 'resolver' and 'summary'.
+    """
+    timestamp = context.timestamp
+    record = {
+        'ticket': context.ticket,
+        'extId': context.reference_id,
+        'date': timestamp[:10] if timestamp else None,
+        'context': str(context),
+        'reply': reply,
+        'kb': kb,
+        'stack': stack,
+        'resolver': None,
+        'summary': summary,
+    }
+    set_resolver(record, resolved)
+    return record
+
+
+def set_resolver(record, resolved):
+    """Store a resolve_ticket result (or resolve_tickets entry) in record."""
+    if resolved is None or 'error' in resolved:
+        return
+    record['resolver'] = {
+        'outputs': resolved['outputs'],
+        'archives': resolved['archives'],
+        'verdict': resolved['verdict'],
+        'stepsRun': resolved.get('steps_run'),
+    }
+
+
+class ResultStore:
+    """
+    SQLite store of triage records (see ticket_record), one row per ticket,
+    indexed by ticket, ExtID and date. The database runs in WAL mode, so
+    readers are not blocked while a batch is written and several processes
+    may share it.
+
+    put buffers records and writes them batch_size at a time in a single
+    transaction; call flush (or close) to write the rest. Queries flush
+    first, so they see every record put so far. Putting a ticket again
+    replaces its record.
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH, batch_size=STORE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=STORE_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != STORE_SCHEMA_VERSION:
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS tickets")
+                self.conn.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+
+    def put(self, record):
+        """Queue record for writing; a full batch is written at once."""
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every queued record in one transaction."""
+        if not self.pending:
+            return
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        rows = [(record['ticket'], record.get('extId'), record.get('date'), updated_at,
+                 json.dumps(record, separators=(',', ':')))
+                for record in self.pending]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tickets (ticket, ext_id, ticket_date, updated_at, record) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        self.pending = []
+
+    def _query(self, where='', args=()):
+        self.flush()
+        rows = self.conn.execute(f"SELECT record FROM tickets {where} ORDER BY ticket", args)
+        return [json.loads(record) for record, in rows]
+
+    def get(self, ticket):
+        """The record of ticket, or None."""
+        records = self._query("WHERE ticket = ?", (ticket,))
+        return records[0] if records else None
+
+    def find_by_ext_id(self, ext_id):
+        """Records of the tickets with ExtID (Ref No) ext_id."""
+        return self._query("WHERE ext_id = ?", (ext_id,))
+
+    def find_by_date(self, start, end=None):
+        """Records of the tickets dated start..end ('YYYY-MM-DD', inclusive; end defaults to start)."""
+        return self._query("WHERE ticket_date BETWEEN ? AND ?", (start, end or start))
+
+    def records(self):
+        """Every record, in ticket order."""
+        return self._query()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def export_record(record, out_root):
+    """
+    Write record in the per-ticket file layout under out_root:
+    replies/, contexts/, kb-search-result/, stack-found/ and the
+    bot-resolve/ step files. Returns the paths written.
+    """
+    ticket = record['ticket']
+    files = [
+        (REPLIES_FOLDER_NAME, f"{ticket}_reply.txt", record['reply']),
+        (CONTEXTS_FOLDER_NAME, f"{ticket}_context.txt", record['context']),
+    ]
+    if record['kb'] is not None:
+        files.append((RESULT_FOLDER_NAME, f"{ticket}_context_result.txt", result_text(record['kb'])))
+    if record['stack'] is not None:
+        files.append((STACK_FOUND_FOLDER, f"{ticket}_classification.txt", classification_text(record['stack'])))
+    if record['resolver'] is not None:
+        for name, text in record['resolver']['outputs'].items():
+            files.append((BOT_RESOLVE_FOLDER_NAME, f"{ticket}_context_{name}", text))
+
+    paths = []
+    for folder, file_name, text in files:
+        if text is None:
+            continue
+        out_dir = os.path.join(out_root, folder)
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, file_name)
+        with open(path, 'w', encoding='utf-8') as out:
+            out.write(text)
+        paths.append(path)
+    return paths
+
+
+def export_records(records, out_root):
+    """Export every record (see export_record). Returns the number of files written."""
+    count = 0
+    for record in records:
+        count += len(export_record(record, out_root))
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query or export the triage result store")
+    parser.add_argument('--db', default=RESULT_STORE_PATH, help="result store database")
+    parser.add_argument('--ticket', help="the record of one ticket")
+    parser.add_argument('--ext-id', help="records of the tickets with this ExtID")
+    parser.add_argument('--date', help="records of the tickets dated YYYY-MM-DD (the start, with --until)")
+    parser.add_argument('--until', help="last date of a --date range")
+    parser.add_argument('--export', metavar='DIR',
+                        help="write the selected records (default: all) in the per-ticket file layout under DIR")
+    args = parser.parse_args()
+
+    store = ResultStore(args.db)
+    try:
+        if args.ticket:
+            record = store.get(args.ticket)
+            selected = [record] if record else []
+        elif args.ext_id:
+            selected = store.find_by_ext_id(args.ext_id)
+        elif args.date:
+            selected = store.find_by_date(args.date, args.until)
+        else:
+            selected = store.records()
+    finally:
+        store.close()
+
+    if args.export:
+        count = export_records(selected, args.export)
+        print(f"Exported {len(selected)} ticket(s), {count} files under {args.export}")
+    else:
+        for record in selected:
+            print(json.dumps(record))
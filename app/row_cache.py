@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import bisect
+import os
+import sys
+from collections import OrderedDict
+
+from log_row import parse_rows
+from log_stream import iter_log_rows, read_spans
+
+# Default memory budget for raw rows held per process
+ROW_CACHE_BUDGET_MB = 256
+# Approximate per-row bookkeeping on top of the block text (tuple, ints, list slot)
+ROW_OVERHEAD_BYTES = 120
+
+
+class CachedArchive:
+    """
+    Raw rows of one archive and the archive size/mtime they came from.
+    """
+    __slots__ = ('size', 'mtime', 'rows', 'offsets', 'nbytes')
+
+    def __init__(self, size, mtime, rows):
+        self.size = size
+        self.mtime = mtime
+        self.rows = rows
+        self.offsets = [offset for offset, _, _ in rows]
+        self.nbytes = sum(sys.getsizeof(block) for _, _, block in rows) + ROW_OVERHEAD_BYTES * len(rows)
+
+
+class RowCache:
+    """
+    Raw (offset, length, block) rows per archive path, evicted least
+    recently used first once their estimated size exceeds the budget.
+    An entry is dropped as soon as the archive size or mtime changes, so a
+    rewritten or repacked hour is re-read.
+
+    Only raw rows are cached: the scans match regexes against the block
+    text and read_spans returns it, while log_row.LogRow drops that text.
+    The compact LogRow records are therefore built on demand (records)
+    and not kept here.
+
+    Args:
+        budget_bytes: Memory budget; 0 disables caching (every lookup misses
+                      and nothing is stored).
+    """
+
+    def __init__(self, budget_bytes=ROW_CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, archive_path):
+        entry = self.entries.pop(archive_path)
+        self.nbytes -= entry.nbytes
+
+    def get(self, archive_path):
+        """CachedArchive for archive_path, or None if absent or stale."""
+        entry = self.entries.get(archive_path)
+        if entry is not None:
+            try:
+                st = os.stat(archive_path)
+            except OSError:
+                st = None
+            if st is None or st.st_size != entry.size or st.st_mtime != entry.mtime:
+                self._drop(archive_path)
+                self.invalidations += 1
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(archive_path)
+        self.hits += 1
+        return entry
+
+    def put(self, archive_path, rows, st):
+        """
+        Store rows parsed from archive_path when it had stat result st, then
+        evict old entries down to the budget. An archive larger than the
+        whole budget is not stored.
+        """
+        if self.budget_bytes <= 0:
+            return None
+        entry = CachedArchive(st.st_size, st.st_mtime, rows)
+        if entry.nbytes > self.budget_bytes:
+            return None
+        if archive_path in self.entries:
+            self._drop(archive_path)
+        self.entries[archive_path] = entry
+        self.nbytes += entry.nbytes
+        self._evict()
+        return entry
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its budget."""
+        while self.entries and self.nbytes > self.budget_bytes:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def tee(self, archive_path, rows):
+        """
+        Pass rows (parsed from archive_path) through unchanged and cache them
+        once the iterator is exhausted. Rows stop being collected as soon as
+        they outgrow the budget, so an archive too large to cache is still
+        streamed in flat memory.
+        """
+        st = os.stat(archive_path)
+        collected = [] if self.budget_bytes > 0 else None
+        nbytes = 0
+        for row in rows:
+            if collected is not None:
+                nbytes += sys.getsizeof(row[2]) + ROW_OVERHEAD_BYTES
+                if nbytes > self.budget_bytes:
+                    collected = None
+                else:
+                    collected.append(row)
+            yield row
+        if collected is not None:
+            self.put(archive_path, collected, st)
+
+    def _load(self, archive_path):
+        """Parse archive_path and cache it. Returns (rows, CachedArchive or None)."""
+        st = os.stat(archive_path)
+        rows = list(iter_log_rows(archive_path))
+        return rows, self.put(archive_path, rows, st)
+
+    def rows(self, archive_path):
+        """All rows of archive_path, decompressing and caching them on a miss."""
+        entry = self.get(archive_path)
+        if entry is not None:
+            return entry.rows
+        return self._load(archive_path)[0]
+
+    def records(self, archive_path):
+        """
+        LogRows (log_row.LogRow) of archive_path, parsed from its cached
+        raw rows on every call; the parse cost is paid each time.
+        """
+        return parse_rows(self.rows(archive_path))
+
+    def read_spans(self, archive_path, spans):
+        """
+        Same as log_stream.read_spans, served from the cache when a full
+        scan has already cached the archive. Otherwise only the spans are
+        read from the archive; an index lookup never decompresses and parses
+        the whole hour just to fill the cache.
+        """
+        entry = self.get(archive_path)
+        if entry is None:
+            return read_spans(archive_path, spans)
+        blocks = []
+        for offset, length in sorted(spans):
+            i = bisect.bisect_left(entry.offsets, offset)
+            if i < len(entry.offsets) and entry.offsets[i] == offset and entry.rows[i][1] == length:
+                blocks.append(entry.rows[i][2])
+            else:
+                # Span does not line up with a cached row; fall back to the archive
+                return read_spans(archive_path, spans)
+        return blocks
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.nbytes, 'budgetBytes': self.budget_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+
+# Cache shared by every lookup in the process
+_row_cache = None
+
+
+def get_row_cache():
+    """Return the process-wide RowCache (ROW_CACHE_BUDGET_MB)."""
+    global _row_cache
+    if _row_cache is None:
+        _row_cache = RowCache()
+    return _row_cache
+
+
+def set_row_cache_budget(budget_mb):
+    """Resize the process-wide cache, evicting down to the new budget."""
+    cache = get_row_cache()
+    cache.budget_bytes = int(budget_mb * 1024 * 1024)
+    cache._evict()
+    return cache
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import lzma
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+# Shared decompressed logs, inside the bot-resolve output folder
+SHARED_LOG_FOLDER_NAME = '.shared-logs'
+
+
+class SharedLogCache:
+    """
+    One decompressed copy per archive, shared by every ticket that needs the
+    raw log, instead of one step 3 file per ticket.
+
+    Each <archive>.log has a <archive>.refs.json next to it listing the
+    tickets holding a reference and the archive size/mtime it was built
+    from. The copy is rebuilt when the archive changes and deleted when the
+    last ticket releases it. A lock file serializes updates across processes;
+    copies are decompressed outside it, so one archive's decompression does
+    not hold up tickets on other hours.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _paths(self, archive_path):
+        name = os.path.basename(archive_path)
+        if name.endswith('.xz'):
+            name = name[:-3]
+        log_path = os.path.join(self.cache_dir, f"{name}.log")
+        return log_path, log_path + '.refs.json'
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_refs(refs_path):
+        # Also read without the lock (sink_path), so it may vanish meanwhile
+        try:
+            with open(refs_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_refs(refs_path, refs):
+        tmp_path = refs_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            json.dump(refs, out)
+        os.replace(tmp_path, refs_path)
+
+    @staticmethod
+    def _is_stale(refs, log_path, st):
+        return (
+            refs is None
+            or not os.path.isfile(log_path)
+            or refs.get('archive_size') != st.st_size
+            or refs.get('archive_mtime') != st.st_mtime
+        )
+
+    def sink_path(self, archive_path):
+        """
+        A temp path to decompress archive_path into (e.g. as a scan's sink)
+        when its shared copy is missing or stale, to be handed to install;
+        None when the copy is fresh.
+        """
+        log_path, refs_path = self._paths(archive_path)
+        if not self._is_stale(self._read_refs(refs_path), log_path, os.stat(archive_path)):
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return f"{log_path}.{uuid.uuid4().hex}.tmp"
+
+    def install(self, archive_path, decompressed_path):
+        """
+        Make decompressed_path (see sink_path) the shared copy of
+        archive_path, unless another process installed a fresh one first,
+        in which case it is deleted.
+        """
+        log_path, refs_path = self._paths(archive_path)
+        st = os.stat(archive_path)
+        with self._locked():
+            refs = self._read_refs(refs_path)
+            if not self._is_stale(refs, log_path, st):
+                os.remove(decompressed_path)
+                return
+            os.replace(decompressed_path, log_path)
+            tickets = refs['tickets'] if refs else []
+            self._write_refs(refs_path, {'archive_size': st.st_size, 'archive_mtime': st.st_mtime,
+                                         'tickets': tickets})
+
+    def acquire(self, archive_path, ticket_name):
+        """
+        Take a reference on the decompressed copy of archive_path for
+        ticket_name, decompressing it first if it is missing or stale.
+        Returns the path of the shared decompressed log.
+        """
+        log_path, refs_path = self._paths(archive_path)
+        while True:
+            tmp_path = self.sink_path(archive_path)
+            if tmp_path is not None:
+                try:
+                    with lzma.open(archive_path, 'rb') as src, open(tmp_path, 'wb') as out:
+                        shutil.copyfileobj(src, out)
+                    self.install(archive_path, tmp_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            with self._locked():
+                refs = self._read_refs(refs_path)
+                # Retried if the archive was replaced meanwhile
+                if not self._is_stale(refs, log_path, os.stat(archive_path)):
+                    if ticket_name not in refs['tickets']:
+                        refs['tickets'].append(ticket_name)
+                        self._write_refs(refs_path, refs)
+                    return log_path
+
+    def release(self, archive_path, ticket_name):
+        """
+        Drop ticket_name's reference; the shared copy is deleted once no
+        ticket holds it. Returns True if the copy was deleted.
+        """
+        log_path, refs_path = self._paths(archive_path)
+        with self._locked():
+            refs = self._read_refs(refs_path)
+            if refs is None:
+                return False
+            if ticket_name in refs['tickets']:
+                refs['tickets'].remove(ticket_name)
+            if refs['tickets']:
+                self._write_refs(refs_path, refs)
+                return False
+            for path in (log_path, refs_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return True
+
+    def release_ticket(self, ticket_name):
+        """Release every shared copy held by ticket_name. Returns the number deleted."""
+        deleted = 0
+        if not os.path.isdir(self.cache_dir):
+            return deleted
+        for fn in os.listdir(self.cache_dir):
+            if fn.endswith('.log.refs.json'):
+                archive_name = fn[:-len('.log.refs.json')] + '.xz'
+                if self.release(archive_name, ticket_name):
+                    deleted += 1
+        return deleted
+
+    def cleanup(self):
+        """Delete unreferenced or orphaned shared copies. Returns the number deleted."""
+        deleted = 0
+        if not os.path.isdir(self.cache_dir):
+            return deleted
+        with self._locked():
+            for fn in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, fn)
+                if fn.endswith('.log'):
+                    refs = self._read_refs(path + '.refs.json')
+                    if refs is None or not refs['tickets']:
+                        os.remove(path)
+                        deleted += 1
+                elif fn.endswith('.log.refs.json'):
+                    refs = self._read_refs(path)
+                    if not refs['tickets'] or not os.path.isfile(path[:-len('.refs.json')]):
+                        os.remove(path)
+        return deleted
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
+import json
 import os
+import re
 from typing import Dict, List, Optional
 
-# Issue categories with associated keywords
+# Issue categories with associated keywords (used when the config file is missing)
 ISSUE_KEYWORDS: Dict[str, List[str]] = {
     'backend': ['database', 'db', 'api', 'server', 'integration', 'transaction', 'error', 'exception', 'timeout',
                 'kafka'],
@@ -12,12 +14,104 @@ ISSUE_KEYWORDS: Dict[str, List[str]] = {
     'network': ['network', 'timeout', 'connection', 'latency', 'dns', 'http', 'tcp', 'udp', 'ssl', 'tls', 'slow',
                 'delay', 'delays', 'load', 'performance']
 }
+# Category reported when nothing matches
+DEFAULT_CATEGORY = 'network'
+
+# Weighted keyword table: { "default": str, "categories": { category: { keyword: weight } } }
+STACK_CONFIG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'stack-keywords.json')
+)
+
+# Text is split into words and keywords match whole words only:
+# 'ui' does not hit "build", nor 'app' "application". A word that is not a
+# keyword itself also matches with a plural -s / -es stripped (see
+# StackClassifier.lookup), so "errors" and "crashes" hit 'error' and 'crash'
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
 
 # Output folder for stack classification\;
 STACK_FOUND_FOLDER = 'stack-found'
 
 
-def find_stack(context_path: Optional[str], ticket_path: str) -> str:
+class StackClassifier:
+    """
+    Keyword table compiled to token -> [(category index, weight)], so a text
+    is tokenized once and every category is scored in the same pass however
+    many categories and keywords there are.
+
+    Args:
+        categories: { category: { keyword: weight } }, in tie-break order.
+        default: Category returned when no keyword matches.
+    """
+
+    def __init__(self, categories, default=DEFAULT_CATEGORY):
+        self.categories = list(categories)
+        self.default = default
+        self.table = {}
+        for i, category in enumerate(self.categories):
+            for keyword, weight in categories[category].items():
+                self.table.setdefault(keyword.lower(), []).append((i, float(weight)))
+
+    def lookup(self, token):
+        """(category index, weight) hits of token, trying its singular if it has none."""
+        hits = self.table.get(token)
+        if hits is None and token.endswith('s') and not token.endswith('ss'):
+            hits = self.table.get(token[:-1])
+            if hits is None and token.endswith('es'):
+                hits = self.table.get(token[:-2])
+        return hits
+
+    def scores(self, text):
+        """{ category: score } for text."""
+        totals = [0.0] * len(self.categories)
+        lookup = self.lookup
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            hits = lookup(token)
+            if hits:
+                for i, weight in hits:
+                    totals[i] += weight
+        return dict(zip(self.categories, totals))
+
+    def classify(self, text):
+        """Highest-scoring category (the earliest one on ties), or the default if none match."""
+        best_category, best_score = self.default, 0.0
+        for category, score in self.scores(text).items():
+            if score > best_score:
+                best_category, best_score = category, score
+        return best_category
+
+    def classify_many(self, texts):
+        """Classify an iterable of texts; returns the categories in order."""
+        return [self.classify(text) for text in texts]
+
+
+def load_classifier(config_path=STACK_CONFIG_PATH):
+    """
+    Build a StackClassifier from the keyword config, falling back to
+    ISSUE_KEYWORDS (weight 1 each) if the file does not exist.
+    """
+    if not os.path.isfile(config_path):
+        return StackClassifier({c: {kw: 1 for kw in kws} for c, kws in ISSUE_KEYWORDS.items()})
+    with open(config_path, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+    return StackClassifier(cfg['categories'], cfg.get('default', DEFAULT_CATEGORY))
+
+
+# Classifier shared by every call in the process, and the config mtime it was built from
+_classifier = None
+_classifier_mtime = None
+
+
+def get_classifier():
+    """Return the process-wide StackClassifier, rebuilt when the config file changes."""
+    global _classifier, _classifier_mtime
+    mtime = os.stat(STACK_CONFIG_PATH).st_mtime if os.path.isfile(STACK_CONFIG_PATH) else None
+    if _classifier is None or mtime != _classifier_mtime:
+        _classifier = load_classifier()
+        _classifier_mtime = mtime
+    return _classifier
+
+
+def find_stack(context_path: Optional[str], ticket_path: str, context=None, write: bool = True) -> str:
     """
     Classify an issue as backend, frontend, app, or network based on keyword matching
     in the context text. Handles missing or null context_path gracefully.
@@ -27,33 +121,33 @@ def find_stack(context_path: Optional[str], ticket_path: str) -> str:
     Args:
       context_path: Optional path to the context file containing ticket details.
       ticket_path: Path to the original ticket file (for naming output).
+      context: Optional gather_context.Context of the ticket; its text is
+        classified instead of reading context_path.
+      write: With False, the classification file is not written.
 
     Returns:
       The identified issue category.
     """
+    # Score every category in one pass over the tokens
+    text = str(context) if context is not None else _read_context(context_path)
+    best_category = get_classifier().classify(text)
+    if write:
+        _write_classification(context_path, ticket_path, best_category)
+
+    # Print and return the classification
+    print(f"Issue classified as: {best_category}")
+    return best_category
+
+
+def _read_context(context_path):
     # Safely read context content
-    text = ''
     if context_path and os.path.isfile(context_path):
         with open(context_path, 'r', encoding='utf-8') as f:
-            text = f.read().lower()
+            return f.read()
+    return ''
 
-    # Score each category by counting keyword occurrences
-    scores = {category: 0 for category in ISSUE_KEYWORDS}
-    for category, keywords in ISSUE_KEYWORDS.items():
-        for kw in keywords:
-            scores[category] += text.count(kw)
-
-    # If text is empty or no keywords matched, default to 'network' for service slowness contexts
-    if not text or all(score == 0 for score in scores.values()):
-        best_category = 'network'
-    else:
-        # Determine best category by highest score
-        best_category, best_score = 'unknown', 0
-        for category, score in scores.items():
-            if score > best_score:
-                best_category, best_score = category, score
-        # If tie or zero, default to unknown
 
+def _write_classification(context_path, ticket_path, category):
     # Determine base directory for output
     if context_path and os.path.isdir(os.path.dirname(context_path)):
         base_dir = os.path.dirname(context_path)
@@ -68,11 +162,24 @@ def find_stack(context_path: Optional[str], ticket_path: str) -> str:
 
     # Write classification result
     with open(out_file, 'w', encoding='utf-8') as out:
-        out.write(f"issue_type: {best_category}\n")
+        out.write(classification_text(category))
+    return out_file
 
-    # Print and return the classification
-    print(f"Issue classified as: {best_category}")
-    return best_category
+
+def classification_text(category):
+    """Contents of a classification file."""
+    return f"issue_type: {category}\n"
+
+
+def find_stacks(context_paths: List[Optional[str]], ticket_paths: List[str]) -> List[str]:
+    """
+    Batch form of find_stack: classify many tickets with one classifier and
+    write each classification file. Returns the categories in input order.
+    """
+    categories = get_classifier().classify_many(_read_context(path) for path in context_paths)
+    for context_path, ticket_path, category in zip(context_paths, ticket_paths, categories):
+        _write_classification(context_path, ticket_path, category)
+    return categories
 
 
 # Example usage
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from triage_metrics import stage
+
+# Bump to invalidate every cached step output
+STEP_CACHE_VERSION = 1
+# Cached outputs kept, in memory and on disk; least recently used dropped first
+STEP_CACHE_MAX_ENTRIES = 5000
+# Cached outputs on disk unused for this long are deleted
+STEP_CACHE_MAX_AGE_DAYS = 30
+# Outputs written between two prunes of the disk cache
+STEP_CACHE_PRUNE_INTERVAL = 100
+
+
+class Step:
+    """
+    A node in a StepGraph.
+
+    Args:
+        name: Name under which the step's output is stored.
+        func: Called with the step's inputs (and params) as keyword arguments.
+        inputs: Names of graph inputs or earlier step outputs the step depends
+                on. Only these make up the memoization key.
+        params: Names of run options passed through to func without being
+                part of the key (e.g. worker counts, output paths).
+        memoize: Set to False for steps that must always run, such as ones
+                 that look at the filesystem.
+    """
+
+    def __init__(self, name, func, inputs, params=(), memoize=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = list(params)
+        self.memoize = memoize
+
+
+class StepGraph:
+    """
+    Runs Steps in dependency order, each exactly once per run, feeding every
+    step its inputs directly. Outputs of memoized steps are cached by a hash
+    of the step name and its input values, in memory and (if cache_dir is
+    given) as JSON files on disk, so a re-run with the same inputs skips them.
+    Step outputs must therefore be JSON-serializable.
+
+    Both caches hold at most max_entries outputs. A file's mtime is its last
+    use; the disk cache is pruned of files unused for max_age_days and then
+    of the least recently used ones, when the graph is created and every
+    STEP_CACHE_PRUNE_INTERVAL writes.
+    """
+
+    def __init__(self, steps, cache_dir=None, max_entries=STEP_CACHE_MAX_ENTRIES,
+                 max_age_days=STEP_CACHE_MAX_AGE_DAYS):
+        self.steps = {step.name: step for step in steps}
+        self.order = self._topological_order()
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.memory = OrderedDict()
+        self.puts = 0
+        if cache_dir and os.path.isdir(cache_dir):
+            self.prune()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done or name not in self.steps:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in step graph at {name}")
+            visiting.add(name)
+            for dep in self.steps[name].inputs:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(self.steps[name])
+
+        for name in self.steps:
+            visit(name)
+        return order
+
+    def _key(self, step, kwargs):
+        payload = json.dumps([STEP_CACHE_VERSION, step.name, kwargs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _cache_get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return True, self.memory[key]
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.json")
+            if os.path.isfile(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        value = json.load(f)
+                    # Mark as used, so pruning keeps it
+                    os.utime(path)
+                except Exception:
+                    return False, None
+                self._remember(key, value)
+                return True, value
+        return False, None
+
+    def _cache_put(self, key, value):
+        self._remember(key, value)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, f"{key}.json")
+            # Unique per writer: batch workers may run the same step at once
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                json.dump(value, out)
+            os.replace(tmp_path, path)
+            self.puts += 1
+            if self.puts % STEP_CACHE_PRUNE_INTERVAL == 0:
+                self.prune()
+
+    def prune(self):
+        """
+        Delete cached outputs on disk unused for max_age_days, then the least
+        recently used ones beyond max_entries. Returns the number deleted.
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            entry = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.stat(entry).st_mtime, entry))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        deleted = 0
+        for i, (mtime, entry) in enumerate(entries):
+            if i >= excess and mtime >= cutoff:
+                break
+            try:
+                os.remove(entry)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def run(self, inputs, params=None):
+        """
+        Execute the graph.
+
+        Args:
+            inputs: Graph inputs by name (part of the memoization keys). A
+                    step whose output is given here is not run.
+            params: Options by name, passed to steps that declare them.
+
+        Returns:
+            (values, ran) where values holds the inputs and every step output
+            by name, and ran lists the steps that actually executed.
+        """
+        params = params or {}
+        values = dict(inputs)
+        ran = []
+        for step in self.order:
+            if step.name in values:
+                continue
+            kwargs = {name: values[name] for name in step.inputs}
+            key = None
+            if step.memoize:
+                key = self._key(step, kwargs)
+                hit, value = self._cache_get(key)
+                if hit:
+                    values[step.name] = value
+                    continue
+            call_kwargs = dict(kwargs)
+            call_kwargs.update({name: params.get(name) for name in step.params})
+            with stage(step.name):
+                value = step.func(**call_kwargs)
+            if step.memoize:
+                self._cache_put(key, value)
+            values[step.name] = value
+            ran.append(step.name)
+        return values, ran
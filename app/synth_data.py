@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import lzma
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+# Folder names of a generated dataset; same layout as the repo root, so the
+# resolver finds ../log-files, ../reports, ... relative to each context file
+LOG_FOLDER_NAME = 'log-files'
+TICKET_FOLDER_NAME = 'tickets'
+CONTEXT_FOLDER_NAME = 'contexts'
+REPORT_FOLDER_NAME = 'reports'
+MANIFEST_NAME = 'dataset.json'
+
+# Archive name produced by the MMBL Integration template in config/log-location.json
+ARCHIVE_NAME_FORMAT = "integration.log.%Y-%m-%d.%H.xz"
+
+# Bytes of rows joined before each write to the compressor
+WRITE_BATCH_SIZE = 1024 * 1024
+
+PACKAGE = 'com.brainstation.corebankingservice.core'
+ENQUIRY_CLASS = f'{PACKAGE}.soap.component.impl.EnquirySoapComponentImpl'
+NPSB_CLASS = f'{PACKAGE}.rest.component.impl.NPSBCoreComponentImpl'
+CORE_CLASS = f'{PACKAGE}.iso8583.component.impl.CoreBankingServiceImpl'
+
+# (class, method) pairs used for the filler calls of a request
+FILLER_CALLS = [
+    (ENQUIRY_CLASS, 'getAccountListByCustomerID'),
+    (ENQUIRY_CLASS, 'getAccountDetailsByAccountNo'),
+    (ENQUIRY_CLASS, 'getCustomerInfo'),
+    (NPSB_CLASS, 'getToken'),
+    (CORE_CLASS, 'fundTransferRequest'),
+]
+# AuthRespCode of deposits and their relative weights
+AUTH_CODES = {'1': 80, '121': 8, '122': 6, '116': 6}
+AUTH_INFO = {'1': 'Approved', '121': 'Not certified for NPSB network',
+             '122': 'Invalid account', '116': 'Insufficient funds'}
+# Share of filler calls answered with a SOAP fault
+SOAP_FAULT_RATE = 0.05
+
+ROW_HEADER = ('<log-row><dateTime>{ts}</dateTime><request-id>{rid}</request-id><processId>81202</processId>'
+              '<threadName>https-jsse-nio-8443-exec-{thread}</threadName><threadId>{thread_id}</threadId>'
+              '<threadPriority>5</threadPriority><logger>integrationLogger</logger><log-level>TRACE</log-level>\n')
+
+# Distinct made-up terms of the full-text benchmark corpus (see fulltext_corpus)
+FULLTEXT_VOCABULARY_SIZE = 20000
+# Words per full-text benchmark report
+FULLTEXT_REPORT_WORDS = 100
+
+REPORT_WORDS = ('transaction deposit transfer failure timeout network certification account balance '
+                'token soap fault gateway settlement reconciliation retry escalation customer branch '
+                'npsb beftn card debit credit limit login otp mobile app server database').split()
+
+
+def _timestamp(dt):
+    return dt.strftime('%Y-%m-%d/%H:%M:%S.') + f"{dt.microsecond // 1000:03d}/BDT"
+
+
+def _invoke_row(ts, rid, thread, class_name, method, arguments):
+    return (ROW_HEADER.format(ts=ts, rid=rid, thread=thread, thread_id=thread + 30)
+            + f"<log-message>\nInvoking Service: \nClass: {class_name}\nMethod: {method}\n"
+              f"Arguments: {arguments}\n</log-message></log-row>\n")
+
+
+def _return_row(ts, rid, thread, class_name, method, response):
+    return (ROW_HEADER.format(ts=ts, rid=rid, thread=thread, thread_id=thread + 30)
+            + f"<log-message>\nService Invocation returned: \nClass: {class_name} \nMethod: {method} \n"
+              f"Response: {response} \n</log-message></log-row>\n")
+
+
+def _text_row(ts, rid, thread, text):
+    return (ROW_HEADER.format(ts=ts, rid=rid, thread=thread, thread_id=thread + 30)
+            + f"<log-message>\n{text}\n</log-message></log-row>\n")
+
+
+def _filler_response(rng, method):
+    if rng.random() < SOAP_FAULT_RATE:
+        return json.dumps({'responseCode': 1501, 'responseMessages': [
+            'Client received SOAP Fault from server: Server was unable to process request.']})
+    items = {f"FIELD_{i}": rng.randrange(10 ** 9) for i in range(rng.randrange(2, 12))}
+    return json.dumps({'responseCode': 100, 'responseMessages': [], 'method': method, 'items': items})
+
+
+class RequestFlow:
+    """
+    The rows of one request-id, produced lazily so that several flows can be
+    interleaved like concurrent server threads. A deposit flow ends with the
+    AccountDepositRequest and doAccountBaseDeposit rows carrying its ExtID.
+    rows yields (make_row, is_verdict) pairs; make_row takes the row timestamp.
+    """
+
+    def __init__(self, rng, thread, fanout, ext_id=None):
+        self.rid = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        self.thread = thread
+        self.ext_id = ext_id
+        self.code = None
+        self.rows = self._rows(rng, max(2, fanout))
+
+    def _rows(self, rng, fanout):
+        fillers = (fanout - 4) // 2 if self.ext_id else fanout // 2
+        for _ in range(max(0, fillers)):
+            class_name, method = rng.choice(FILLER_CALLS)
+            yield (lambda ts, c=class_name, m=method: _invoke_row(
+                ts, self.rid, self.thread, c, m, f'"{rng.randrange(10 ** 10):010d}"')), False
+            yield (lambda ts, c=class_name, m=method: _return_row(
+                ts, self.rid, self.thread, c, m, _filler_response(rng, m))), False
+        if self.ext_id:
+            self.code = rng.choices(list(AUTH_CODES), weights=list(AUTH_CODES.values()))[0]
+            arguments = json.dumps({'InputParameter': {'KeyID': str(rng.randrange(10 ** 8)),
+                                                        'ExtID': self.ext_id, 'BankName': 'SONB',
+                                                        'Amount': f"{rng.randrange(100, 100000)}.0"}})
+            yield (lambda ts: _invoke_row(
+                ts, self.rid, self.thread, NPSB_CLASS, 'doAccountBaseDeposit', arguments)), False
+            yield (lambda ts: _text_row(
+                ts, self.rid, self.thread,
+                f"<AccountDepositRequest><InputParameter><BankCode>51</BankCode><ExtID>{self.ext_id}</ExtID>"
+                f"<UserID>MMBL</UserID><BankName>SONB</BankName></InputParameter></AccountDepositRequest>")), False
+            response = json.dumps({'OutputParameter': {'AuthRespCode': self.code, 'Info': AUTH_INFO[self.code]}})
+            yield (lambda ts: _return_row(
+                ts, self.rid, self.thread, NPSB_CLASS, 'doAccountBaseDeposit', response)), True
+
+
+def generate_archive(archive_path, hour, size_mb, fanout=10, deposit_ratio=0.2, concurrency=8,
+                     preset=1, seed=0):
+    """
+    Write one hourly .xz archive of synthetic <log-row> blocks in the format
+    of log-files/integration.log.2025-05-08.17.xz.
+
+    Args:
+        archive_path: Output .xz path.
+        hour: datetime of the hour covered; row timestamps span the hour.
+        size_mb: Decompressed size to generate, in MB.
+        fanout: Rows per request-id.
+        deposit_ratio: Share of requests that are deposits with an ExtID.
+        concurrency: Requests interleaved at any time (like server threads).
+        preset: xz compression preset.
+        seed: Random seed; the same arguments produce the same archive.
+
+    Returns:
+        List of deposits as dicts with extId, requestId, dateTime and authRespCode.
+    """
+    rng = random.Random(f"{seed}-{hour.isoformat()}")
+    target = int(size_mb * 1024 * 1024)
+    hour = hour.replace(minute=0, second=0, microsecond=0)
+    deposits = []
+    written = 0
+    batch, batch_size = [], 0
+
+    def new_flow(thread):
+        ext_id = None
+        if rng.random() < deposit_ratio:
+            ext_id = f"IBP{hour:%y%m%d}{rng.randrange(10 ** 8):08d}"
+        return RequestFlow(rng, thread, fanout, ext_id)
+
+    with lzma.open(archive_path, 'wb', preset=preset) as out:
+        flows = [new_flow(thread) for thread in range(1, concurrency + 1)]
+        while written + batch_size < target:
+            i = rng.randrange(len(flows))
+            flow = flows[i]
+            step = next(flow.rows, None)
+            if step is None:
+                flows[i] = new_flow(flow.thread)
+                continue
+            make_row, is_verdict = step
+            # Timestamps advance with the bytes written, so the rows span the hour
+            dt = hour + timedelta(seconds=3599.999 * (written + batch_size) / target)
+            row = make_row(_timestamp(dt))
+            if is_verdict:
+                deposits.append({'extId': flow.ext_id, 'requestId': flow.rid,
+                                 'dateTime': dt.strftime('%Y-%m-%d %H:%M:%S'), 'authRespCode': flow.code})
+            data = row.encode('utf-8')
+            batch.append(data)
+            batch_size += len(data)
+            if batch_size >= WRITE_BATCH_SIZE:
+                out.write(b''.join(batch))
+                written += batch_size
+                batch, batch_size = [], 0
+        out.write(b''.join(batch))
+    return deposits
+
+
+def ticket_text(deposit, dt):
+    """A customer ticket about deposit, in the style of tickets/ticket_0001.txt."""
+    return ("Dear Sir,\n\nWe observed the following transaction failure:\n\n"
+            f"Date/Time: {dt:%Y-%m-%d %H:%M:%S} BDT\nExtID: {deposit['extId']}\n\n"
+            "Please check and advise.\n\nThanks & Regards,\nSynthetic User\nMMBL Internet Banking\n")
+
+
+def context_text(ticket_name, deposit, dt):
+    """The context gather_context would write for the ticket, in the style of contexts/."""
+    return (f"Ticket: {ticket_name}\nProject: MMBL\nProblem: Transaction failure:\n"
+            f"Date/Time: {dt:%Y-%m-%d %H:%M:%S} BDT\nRef No.: {deposit['extId']}")
+
+
+def report_json(rng, deposit):
+    """A KB report in the format of reports/report_0004.json about deposit."""
+    occurred = datetime.strptime(deposit['dateTime'], '%Y-%m-%d %H:%M:%S')
+
+    def words(n):
+        return ' '.join(rng.choice(REPORT_WORDS) for _ in range(n))
+
+    return {
+        'metadata': {
+            'issue': f"Deposit failure {deposit['authRespCode']}: {words(6)}",
+            'occurrence_datetime': occurred.strftime('%Y-%m-%dT%H:%M:%S.000+06:00'),
+            'extId': deposit['extId'],
+            'requestId': deposit['requestId'],
+            'authRespCode': deposit['authRespCode'],
+            'failure_reason': AUTH_INFO[deposit['authRespCode']],
+            'severity': rng.choice(['Low', 'Medium', 'High']),
+            'system': 'MMBL Internet Banking',
+            'tags': rng.sample(REPORT_WORDS, 5),
+        },
+        'mainContentBody': {
+            'whatHappened': words(40),
+            'whyItHappened': words(30),
+            'howResolved': [words(12) for _ in range(4)],
+            'preventiveSteps': [words(10) for _ in range(3)],
+        },
+    }
+
+
+def fulltext_corpus(n_reports, seed=0):
+    """
+    n_reports (filename, text) pairs for benchmarking kb_fulltext at scale.
+    Words follow a Zipf distribution over FULLTEXT_VOCABULARY_SIZE terms, so
+    document frequencies spread as in prose; REPORT_WORDS alone would put
+    every term in most reports.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"t{rank}q" for rank in range(FULLTEXT_VOCABULARY_SIZE)]
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, FULLTEXT_VOCABULARY_SIZE + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    return [(f"report_{n:06d}.json",
+             ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=FULLTEXT_REPORT_WORDS)))
+            for n in range(1, n_reports + 1)]
+
+
+def generate_dataset(out_dir, start, hours=1, size_mb=8, fanout=10, deposit_ratio=0.2,
+                     tickets=20, reports=100, preset=1, seed=0):
+    """
+    Generate archives, tickets, contexts and KB reports under out_dir, laid
+    out like the repo root, plus a dataset.json manifest.
+
+    Tickets are about random deposits, reported up to five minutes after the
+    deposit within the same hour; the first half of the KB reports describe
+    ticketed deposits, the rest other deposits.
+
+    Returns:
+        The manifest dict.
+    """
+    rng = random.Random(seed)
+    start = start.replace(minute=0, second=0, microsecond=0)
+    dirs = {name: os.path.join(out_dir, name)
+            for name in (LOG_FOLDER_NAME, TICKET_FOLDER_NAME, CONTEXT_FOLDER_NAME, REPORT_FOLDER_NAME)}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+
+    deposits = []
+    for i in range(hours):
+        hour = start + timedelta(hours=i)
+        archive_path = os.path.join(dirs[LOG_FOLDER_NAME], hour.strftime(ARCHIVE_NAME_FORMAT))
+        print(f"Generating {archive_path} ({size_mb} MB)")
+        deposits.extend(generate_archive(archive_path, hour, size_mb, fanout, deposit_ratio,
+                                         preset=preset, seed=seed))
+    if not deposits:
+        raise ValueError("No deposits generated; increase size_mb or deposit_ratio")
+
+    ticketed = rng.sample(deposits, min(tickets, len(deposits)))
+    ticket_names = []
+    for n, deposit in enumerate(ticketed, start=1):
+        name = f"ticket_{n:04d}"
+        occurred = datetime.strptime(deposit['dateTime'], '%Y-%m-%d %H:%M:%S')
+        hour_end = occurred.replace(minute=59, second=59)
+        dt = min(occurred + timedelta(seconds=rng.randrange(300)), hour_end)
+        with open(os.path.join(dirs[TICKET_FOLDER_NAME], f"{name}.txt"), 'w', encoding='utf-8') as out:
+            out.write(ticket_text(deposit, dt))
+        with open(os.path.join(dirs[CONTEXT_FOLDER_NAME], f"{name}_context.txt"), 'w', encoding='utf-8') as out:
+            out.write(context_text(name, deposit, dt))
+        ticket_names.append(name)
+
+    ticketed_ids = {d['extId'] for d in ticketed}
+    others = [d for d in deposits if d['extId'] not in ticketed_ids]
+    n_ticketed = min(len(ticketed), reports // 2)
+    reported = ticketed[:n_ticketed] + rng.sample(others, min(len(others), reports - n_ticketed))
+    for n, deposit in enumerate(reported, start=1):
+        with open(os.path.join(dirs[REPORT_FOLDER_NAME], f"report_{n:06d}.json"), 'w', encoding='utf-8') as out:
+            json.dump(report_json(rng, deposit), out, indent=2)
+
+    manifest = {
+        'start': start.strftime('%Y-%m-%d %H:%M:%S'), 'hours': hours, 'sizeMb': size_mb,
+        'fanout': fanout, 'depositRatio': deposit_ratio, 'seed': seed, 'preset': preset,
+        'deposits': len(deposits), 'tickets': ticket_names, 'reports': len(reported),
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as out:
+        json.dump(manifest, out, indent=2)
+    print(f"Dataset written to {out_dir}: {len(deposits)} deposits, "
+          f"{len(ticket_names)} tickets, {len(reported)} reports")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic integration logs, tickets and KB reports")
+    parser.add_argument('out_dir')
+    parser.add_argument('--start', default='2025-05-08 17:00:00', help="first hour (YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument('--hours', type=int, default=1)
+    parser.add_argument('--size-mb', type=float, default=8, help="decompressed MB per hourly archive")
+    parser.add_argument('--fanout', type=int, default=10, help="rows per request-id")
+    parser.add_argument('--deposit-ratio', type=float, default=0.2, help="share of requests carrying an ExtID")
+    parser.add_argument('--tickets', type=int, default=20)
+    parser.add_argument('--reports', type=int, default=100)
+    parser.add_argument('--preset', type=int, default=1, help="xz compression preset")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_dataset(args.out_dir, datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S'), args.hours,
+                     args.size_mb, args.fanout, args.deposit_ratio, args.tickets, args.reports,
+                     args.preset, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -57,14 +57,16 @@ def generate_ack_reply(ticket: Ticket) -> str:
     return "Thank you for reporting this issue, we're investigating."
 
 
-def read_and_reply(ticket_filename: str) -> None:
+def read_and_reply(ticket_filename: str, write: bool = True) -> str:
     """
-    Read a plain-text ticket from the ../tickets folder, generate context and reply,
+    Read a plain-text ticket from the ../tickets folder (or from ticket_filename
+    if it is an absolute path), generate context and reply,
     and write them separately to ../context and ../replies folders.
 
     The context file is named:    ../context/<base>_context.txt
     The reply file is named:      ../replies/<base>_reply.txt
     where <base> is the ticket filename without extension.
+    With write=False nothing is written. Returns the reply text.
     """
     # Determine directories
     base_dir = os.path.dirname(__file__)
@@ -72,10 +74,6 @@ def read_and_reply(ticket_filename: str) -> None:
     context_dir = os.path.join(base_dir, '..', 'context')
     replies_dir = os.path.join(base_dir, '..', 'replies')
 
-    # Create output directories if they don't exist
-    os.makedirs(context_dir, exist_ok=True)
-    os.makedirs(replies_dir, exist_ok=True)
-
     # Read the ticket text
     ticket_path = os.path.join(tickets_dir, ticket_filename)
     with open(ticket_path, 'r', encoding='utf-8') as f:
@@ -85,9 +83,15 @@ def read_and_reply(ticket_filename: str) -> None:
     ticket = read_ticket_from_text(raw_text)
     # context = gather_context(ticket)
     reply = generate_ack_reply(ticket)
+    if not write:
+        return reply
+
+    # Create output directories if they don't exist
+    os.makedirs(context_dir, exist_ok=True)
+    os.makedirs(replies_dir, exist_ok=True)
 
     # Derive base filename (without extension)
-    base, _ = os.path.splitext(ticket_filename)
+    base, _ = os.path.splitext(os.path.basename(ticket_filename))
     # context_path = os.path.join(context_dir, f"{base}_context.txt")
     reply_path = os.path.join(replies_dir, f"{base}_reply.txt")
 
@@ -101,3 +105,4 @@ def read_and_reply(ticket_filename: str) -> None:
 
     # print(f"Context written to {context_path}")
     print(f"Reply written to {reply_path}")
+    return reply
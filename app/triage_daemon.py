@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from main import _init_worker, _process_in_worker
+from row_cache import get_row_cache
+
+# Tickets submitted as text are written here before processing
+TICKETS_FOLDER_NAME = 'tickets'
+# Latencies kept for the /stats percentiles
+LATENCY_WINDOW = 1000
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1024 * 1024
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+                500: 'Internal Server Error'}
+
+
+class TriageDaemon:
+    """
+    Long-running triage service. The NER model, KB index, log-location
+    registry and resolver step caches are loaded once per worker process
+    (see main._init_worker) and stay warm across tickets; recently used
+    archive rows stay in each worker's row cache (row_cache, sized with
+    row_cache_mb).
+
+    Speaks a minimal HTTP/1.1 over TCP or a Unix socket:
+      POST /tickets  {"ticket": "<file under ../tickets>"}
+                     or {"name": "<new ticket name>", "text": "<raw ticket text>"}
+                     with an optional "project"; returns the process_ticket summary.
+                     Submitted text never replaces an existing ticket (409).
+      GET  /health   liveness check.
+      GET  /stats    ticket count and p50/p95 latency in milliseconds.
+
+    Args:
+        workers: Worker processes. 0 processes tickets in the daemon process
+                 on one background thread, which avoids IPC when throughput
+                 is low.
+        project: Default project for tickets that do not name one.
+        row_cache_mb: Memory budget for cached log rows in each worker.
+    """
+
+    def __init__(self, workers=None, project="MMBL", row_cache_mb=None):
+        self.project = project
+        self.row_cache_mb = row_cache_mb
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.pool = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.processed = 0
+        self.failed = 0
+        base_dir = os.path.dirname(__file__)
+        self.tickets_dir = os.path.abspath(os.path.join(base_dir, '..', TICKETS_FOLDER_NAME))
+
+    def start(self):
+        """Start the worker pool (or warm the in-process caches) before serving."""
+        if self.workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.row_cache_mb,))
+            # Make every worker load its caches now rather than on its first ticket
+            list(self.pool.map(_init_worker_ready, range(self.workers)))
+        else:
+            _init_worker(self.row_cache_mb)
+            self.pool = ThreadPoolExecutor(max_workers=1)
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+        stats = {'processed': self.processed, 'failed': self.failed, 'workers': self.workers,
+                 'p50Ms': percentile(0.50), 'p95Ms': percentile(0.95)}
+        if self.workers == 0:
+            # Worker processes keep their own caches; only the in-process one is visible here
+            stats['rowCache'] = get_row_cache().stats()
+        return stats
+
+    def _ticket_path(self, payload):
+        """
+        Resolve the ticket file for a request, writing submitted text to the
+        tickets folder. Raises ValueError for a ticket outside the tickets
+        folder and FileExistsError for text submitted under an existing name.
+        """
+        if 'text' in payload:
+            name = os.path.basename(str(payload.get('name') or f"ticket_{int(time.time() * 1000)}"))
+            if not name.endswith('.txt'):
+                name += '.txt'
+            path = os.path.join(self.tickets_dir, name)
+            os.makedirs(self.tickets_dir, exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                out.write(payload['text'])
+            try:
+                # Unlike os.replace, fails if the name is taken
+                os.link(tmp_path, path)
+            except FileExistsError:
+                raise FileExistsError(f"Ticket {name} already exists") from None
+            finally:
+                os.remove(tmp_path)
+            return path
+        if payload.get('ticket'):
+            tickets_dir = os.path.realpath(self.tickets_dir)
+            path = os.path.realpath(os.path.join(tickets_dir, str(payload['ticket'])))
+            if os.path.dirname(path) != tickets_dir:
+                raise ValueError(f"Ticket {payload['ticket']} is not a file in the tickets folder")
+            return path
+        raise ValueError("Request needs either 'ticket' or 'text'")
+
+    async def triage(self, payload):
+        """Run the pipeline for one ticket request and return its summary."""
+        loop = asyncio.get_running_loop()
+        # File I/O stays off the event loop, on the loop's default thread pool
+        ticket_path = await loop.run_in_executor(None, self._ticket_path, payload)
+        project = payload.get('project') or self.project
+        started = time.perf_counter()
+        summary, _ = await loop.run_in_executor(self.pool, _process_in_worker, ticket_path, project)
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        self.processed += 1
+        if summary.get('error'):
+            self.failed += 1
+        return summary
+
+    async def handle(self, reader, writer):
+        """Serve HTTP requests on one connection (keep-alive until the client closes)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'})
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length'})
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {'error': 'Request body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, result = await self._dispatch(method, target, body)
+                await self._respond(writer, status, result)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        path = target.split('?', 1)[0]
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path != '/tickets':
+            return 404, {'error': f"Unknown path {path}"}
+        if method != 'POST':
+            return 405, {'error': 'Use POST /tickets'}
+        try:
+            payload = json.loads(body or b'{}')
+            return 200, await self.triage(payload)
+        except FileExistsError as e:
+            return 409, {'error': str(e)}
+        except (ValueError, FileNotFoundError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    async def _respond(writer, status, result):
+        body = json.dumps(result).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1')
+        writer.write(head + body)
+        await writer.drain()
+
+
+def _init_worker_ready(_):
+    """No-op task; submitting one per worker forces the pool to start and warm up."""
+    return os.getpid()
+
+
+async def serve(daemon, host='127.0.0.1', port=8765, socket_path=None):
+    """Serve the daemon on socket_path (Unix socket) or host:port until cancelled."""
+    daemon.start()
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(daemon.handle, path=socket_path)
+        print(f"Triage daemon listening on {socket_path}")
+    else:
+        server = await asyncio.start_server(daemon.handle, host, port)
+        print(f"Triage daemon listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        daemon.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ticket triage with warm caches")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', metavar='PATH',
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: CPU count; 0 = in-process)")
+    parser.add_argument('--project', default="MMBL")
+    parser.add_argument('--row-cache-mb', type=float, default=None,
+                        help="memory budget per worker for cached log rows")
+    args = parser.parse_args()
+
+    daemon = TriageDaemon(args.workers, args.project, args.row_cache_mb)
+    try:
+        asyncio.run(serve(daemon, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import cProfile
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Per-ticket records are appended here (relative to the repo root)
+METRICS_FOLDER_NAME = 'metrics'
+METRICS_FILE_NAME = 'triage-metrics.jsonl'
+PROFILE_FOLDER_NAME = 'profiles'
+METRICS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', METRICS_FOLDER_NAME, METRICS_FILE_NAME)
+)
+
+# Counters every stage reports
+COUNTERS = ('bytesRead', 'bytesDecompressed', 'rowsScanned')
+
+# Active TicketMetrics of the current thread
+_local = threading.local()
+
+
+def _peak_rss_kb():
+    # ru_maxrss is in KB on Linux: the process high-water mark so far
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class TicketMetrics:
+    """
+    Stage timings and resource counters for one ticket.
+
+    Stages nest: counters added while a stage is open count towards it and
+    every enclosing stage, and nested stages are named parent/child. Work
+    done in other processes (scan worker pools) is not seen.
+    """
+
+    def __init__(self, ticket):
+        self.ticket = ticket
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self.started = time.perf_counter()
+        self.stages = []
+        self.open = []
+        self.total_ms = None
+
+    @contextmanager
+    def stage(self, name):
+        if self.open:
+            name = f"{self.open[-1]['stage']}/{name}"
+        record = {'stage': name}
+        record.update({counter: 0 for counter in COUNTERS})
+        self.open.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wallMs'] = round((time.perf_counter() - wall) * 1000, 3)
+            record['cpuMs'] = round((time.process_time() - cpu) * 1000, 3)
+            record['peakRssKb'] = _peak_rss_kb()
+            self.open.remove(record)
+            self.stages.append(record)
+
+    def add(self, counter, n):
+        for record in self.open:
+            record[counter] += n
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 3)
+        return self.to_dict()
+
+    def to_dict(self):
+        return {'ticket': self.ticket, 'startedAt': self.started_at, 'totalMs': self.total_ms,
+                'peakRssKb': _peak_rss_kb(), 'stages': self.stages}
+
+
+def start_ticket(ticket):
+    """Begin recording for ticket on this thread and return its TicketMetrics."""
+    _local.metrics = TicketMetrics(ticket)
+    return _local.metrics
+
+
+def finish_ticket(metrics_path=METRICS_PATH):
+    """
+    Stop recording on this thread; append the ticket's record as one JSON
+    line to metrics_path (if given) and return it.
+    """
+    metrics = getattr(_local, 'metrics', None)
+    _local.metrics = None
+    if metrics is None:
+        return None
+    record = metrics.finish()
+    if metrics_path:
+        os.makedirs(os.path.dirname(metrics_path), exist_ok=True)
+        # One write per record, so lines from concurrent workers do not interleave
+        with open(metrics_path, 'a', encoding='utf-8') as out:
+            out.write(json.dumps(record) + "\n")
+    return record
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage of the ticket being recorded (no-op when none is)."""
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is None:
+        yield None
+        return
+    with metrics.stage(name) as record:
+        yield record
+
+
+def add(counter, n):
+    """Add n to a counter (see COUNTERS) of the open stages, if recording."""
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is not None and metrics.open:
+        metrics.add(counter, n)
+
+
+@contextmanager
+def profiled(profile_path):
+    """cProfile the block and dump the stats to profile_path (no-op if None)."""
+    if not profile_path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+        profiler.dump_stats(profile_path)
+
+
+def keep_slowest_profiles(summaries, keep):
+    """
+    Delete the profiles of all but the `keep` slowest tickets. summaries are
+    process_ticket summaries carrying 'totalMs' and 'profile'.
+    Returns the kept profile paths, slowest first.
+    """
+    profiled_summaries = [s for s in summaries if s.get('profile')]
+    profiled_summaries.sort(key=lambda s: s.get('totalMs') or 0, reverse=True)
+    kept = []
+    for i, summary in enumerate(profiled_summaries):
+        if i < keep:
+            kept.append(summary['profile'])
+        elif os.path.exists(summary['profile']):
+            os.remove(summary['profile'])
+            summary['profile'] = None
+    return kept
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import json
+import os
+
+from log_row import KIND_RETURN, parse_block
+
+# Rules mapping (Class/Method, response field, code) to a verdict
+VERDICT_RULES_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'verdict-rules.json')
+)
+
+# Verdict names a rule may give a code
+VERDICT_SUCCESS = 'success'
+VERDICT_PROBLEM = 'problem'
+VERDICTS = (VERDICT_SUCCESS, VERDICT_PROBLEM)
+# Default message; placeholders: field, code, request_id, class, method, rule
+DEFAULT_MESSAGES = {
+    VERDICT_SUCCESS: "{field}={code} for request-id {request_id}: success",
+    VERDICT_PROBLEM: "{field}={code} for request-id {request_id}: this is the problem",
+}
+
+# Used when the rules file does not exist: the deposit AuthRespCode check
+DEFAULT_RULES = [
+    {'name': 'deposit-auth', 'method': 'doAccountBaseDeposit', 'field': 'AuthRespCode',
+     'codes': {'1': VERDICT_SUCCESS}, 'otherwise': VERDICT_PROBLEM},
+]
+
+
+class VerdictRule:
+    """
+    One rule: the returned invocation of `method` (of `class_name`, full or
+    last component; either may be None for any) whose Response has `field`.
+    codes maps the field's value to a verdict; other values get `otherwise`,
+    or do not match when it is None.
+    """
+    __slots__ = ('priority', 'name', 'class_name', 'method', 'field', 'codes', 'otherwise', 'message')
+
+    def __init__(self, priority, name, field, codes=None, otherwise=None,
+                 class_name=None, method=None, message=None):
+        for verdict in list((codes or {}).values()) + ([otherwise] if otherwise else []):
+            if verdict not in VERDICTS:
+                raise ValueError(f"Unknown verdict {verdict!r} in rule {name}")
+        self.priority = priority
+        self.name = name
+        self.class_name = class_name
+        self.method = method
+        self.field = field
+        self.codes = {str(code): verdict for code, verdict in (codes or {}).items()}
+        self.otherwise = otherwise
+        self.message = message
+
+    def verdict_for(self, code):
+        return self.codes.get(code, self.otherwise)
+
+    def matches_class(self, class_name):
+        return (self.class_name is None or class_name == self.class_name
+                or (class_name or '').rsplit('.', 1)[-1] == self.class_name)
+
+
+class VerdictRules:
+    """
+    Verdict rules compiled into one matcher: rules are bucketed by method
+    (plus a bucket for rules on any method) and every field they read is
+    extracted with a single walk of each Response. evaluate makes one pass
+    over a request's blocks for all rules together; the earliest rule in
+    file order that matches wins, at its first matching block.
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            VerdictRule(i, rule.get('name') or f"rule-{i + 1}", rule['field'], rule.get('codes'),
+                        rule.get('otherwise'), rule.get('class'), rule.get('method'), rule.get('message'))
+            for i, rule in enumerate(rules)
+        ]
+        self.by_method = {}
+        self.any_method = []
+        for rule in self.rules:
+            if rule.method is None:
+                self.any_method.append(rule)
+            else:
+                self.by_method.setdefault(rule.method, []).append(rule)
+        # Rules to try per method, in priority order; other methods use any_method
+        self.candidates = {
+            method: sorted(rules + self.any_method, key=lambda rule: rule.priority)
+            for method, rules in self.by_method.items()
+        }
+        self.fields = list(dict.fromkeys(rule.field for rule in self.rules))
+
+    def evaluate(self, request_id, blocks):
+        """
+        Evaluate every rule over request_id's <log-row> blocks in one pass.
+
+        Returns:
+            dict with 'code' (the matched field value, or None), 'success'
+            (True only for a success verdict), a status 'message' and the
+            matching 'rule' name (or None).
+        """
+        best = None
+        for block in blocks:
+            row = parse_block(block)
+            if row.request_id != request_id or row.kind != KIND_RETURN:
+                continue
+            rules = [rule for rule in self.candidates.get(row.method, self.any_method)
+                     if (best is None or rule.priority < best[0].priority) and rule.matches_class(row.class_name)]
+            if not rules:
+                continue
+            values = row.response_fields({rule.field for rule in rules})
+            for rule in rules:
+                value = values.get(rule.field)
+                if value is None:
+                    continue
+                code = str(value)
+                verdict = rule.verdict_for(code)
+                if verdict is not None:
+                    best = (rule, code, verdict, row)
+                    break
+            if best is not None and best[0].priority == 0:
+                break
+
+        if best is None:
+            fields = '/'.join(self.fields)
+            message = f"No invocation block with {fields} found for request-id {request_id}"
+            return {'code': None, 'success': False, 'message': message, 'rule': None}
+        rule, code, verdict, row = best
+        message = (rule.message or DEFAULT_MESSAGES[verdict]).format(
+            field=rule.field, code=code, request_id=request_id, rule=rule.name,
+            method=row.method, **{'class': row.class_name})
+        return {'code': code, 'success': verdict == VERDICT_SUCCESS, 'message': message, 'rule': rule.name}
+
+
+def load_rules(rules_path=VERDICT_RULES_PATH):
+    """Compile the rules file, or DEFAULT_RULES if it does not exist."""
+    if not os.path.isfile(rules_path):
+        return VerdictRules(DEFAULT_RULES)
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+    return VerdictRules(cfg['rules'])
+
+
+# Rules shared by every evaluation in the process, and the file mtime they were compiled from
+_rules = None
+_rules_mtime = None
+
+
+def get_verdict_rules():
+    """Return the process-wide VerdictRules, recompiled when the rules file changes."""
+    global _rules, _rules_mtime
+    mtime = os.stat(VERDICT_RULES_PATH).st_mtime if os.path.isfile(VERDICT_RULES_PATH) else None
+    if _rules is None or mtime != _rules_mtime:
+        _rules = load_rules()
+        _rules_mtime = mtime
+    return _rules
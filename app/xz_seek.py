@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import lzma
+import os
+import struct
+import zlib
+
+import triage_metrics
+
+# Directory holding the hourly archives (relative to the repo root)
+LOG_FILES_FOLDER_NAME = 'log-files'
+
+# Default uncompressed size of each block written by repack_archive
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+
+STREAM_HEADER_MAGIC = b'\xfd7zXZ\x00'
+STREAM_FOOTER_MAGIC = b'YZ'
+STREAM_HEADER_SIZE = 12
+STREAM_FOOTER_SIZE = 12
+
+# Filter IDs from the xz file format specification
+FILTER_DELTA = 0x03
+FILTER_LZMA2 = 0x21
+
+
+def _check_size(check_type):
+    """Size in bytes of the integrity check field for an xz check type."""
+    if check_type == 0:
+        return 0
+    return 4 << ((check_type - 1) // 3)
+
+
+def _round_up4(n):
+    return (n + 3) & ~3
+
+
+def _read_varint(buf, pos):
+    """Decode an xz multibyte integer; returns (value, new_pos)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _lzma2_dict_size(prop):
+    bits = prop & 0x3F
+    if bits == 40:
+        return 0xFFFFFFFF
+    return (2 | (bits & 1)) << (bits // 2 + 11)
+
+
+class XZBlock:
+    __slots__ = ('compressed_offset', 'unpadded_size', 'uncompressed_offset',
+                 'uncompressed_size', 'check_type')
+
+    def __init__(self, compressed_offset, unpadded_size, uncompressed_offset,
+                 uncompressed_size, check_type):
+        self.compressed_offset = compressed_offset
+        self.unpadded_size = unpadded_size
+        self.uncompressed_offset = uncompressed_offset
+        self.uncompressed_size = uncompressed_size
+        self.check_type = check_type
+
+
+class SeekableXZ:
+    """
+    Random access into an .xz archive using the block index stored at the end
+    of every xz stream. Only the blocks covering a requested range are
+    decompressed. Archives written by plain `xz` hold a single block, so
+    seeking only pays off after repacking them with repack_archive.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.blocks = []
+        with open(archive_path, 'rb') as f:
+            self._parse_index(f)
+        self._starts = [b.uncompressed_offset for b in self.blocks]
+        self._cached_block = None
+        self._cached_data = b''
+
+    @property
+    def size(self):
+        """Total uncompressed size of the archive."""
+        if not self.blocks:
+            return 0
+        last = self.blocks[-1]
+        return last.uncompressed_offset + last.uncompressed_size
+
+    def _parse_index(self, f):
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        streams = []
+        while pos > 0:
+            # Skip stream padding (null bytes in multiples of four)
+            f.seek(pos - 4)
+            if f.read(4) == b'\x00\x00\x00\x00':
+                pos -= 4
+                continue
+
+            f.seek(pos - STREAM_FOOTER_SIZE)
+            footer = f.read(STREAM_FOOTER_SIZE)
+            if footer[10:12] != STREAM_FOOTER_MAGIC:
+                raise ValueError(f"Not an xz stream footer in {self.archive_path}")
+            backward_size = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+            check_type = footer[9] & 0x0F
+
+            index_start = pos - STREAM_FOOTER_SIZE - backward_size
+            f.seek(index_start)
+            index = f.read(backward_size)
+            if index[0] != 0x00:
+                raise ValueError(f"Invalid xz index in {self.archive_path}")
+            count, p = _read_varint(index, 1)
+            records = []
+            for _ in range(count):
+                unpadded, p = _read_varint(index, p)
+                uncompressed, p = _read_varint(index, p)
+                records.append((unpadded, uncompressed))
+
+            blocks_size = sum(_round_up4(unpadded) for unpadded, _ in records)
+            stream_start = index_start - blocks_size - STREAM_HEADER_SIZE
+            f.seek(stream_start)
+            if f.read(len(STREAM_HEADER_MAGIC)) != STREAM_HEADER_MAGIC:
+                raise ValueError(f"Not an xz stream header in {self.archive_path}")
+            streams.append((stream_start, check_type, records))
+            pos = stream_start
+
+        uncompressed_offset = 0
+        for stream_start, check_type, records in reversed(streams):
+            compressed_offset = stream_start + STREAM_HEADER_SIZE
+            for unpadded, uncompressed in records:
+                self.blocks.append(XZBlock(compressed_offset, unpadded, uncompressed_offset,
+                                           uncompressed, check_type))
+                compressed_offset += _round_up4(unpadded)
+                uncompressed_offset += uncompressed
+
+    def _decompress_block(self, block):
+        with open(self.archive_path, 'rb') as f:
+            f.seek(block.compressed_offset)
+            raw = f.read(block.unpadded_size)
+
+        header_size = (raw[0] + 1) * 4
+        flags = raw[1]
+        p = 2
+        if flags & 0x40:
+            _, p = _read_varint(raw, p)
+        if flags & 0x80:
+            _, p = _read_varint(raw, p)
+        filters = []
+        for _ in range((flags & 0x03) + 1):
+            filter_id, p = _read_varint(raw, p)
+            props_size, p = _read_varint(raw, p)
+            props = raw[p:p + props_size]
+            p += props_size
+            if filter_id == FILTER_LZMA2:
+                filters.append({'id': lzma.FILTER_LZMA2, 'dict_size': _lzma2_dict_size(props[0])})
+            elif filter_id == FILTER_DELTA:
+                filters.append({'id': lzma.FILTER_DELTA, 'dist': props[0] + 1})
+            else:
+                filters.append({'id': filter_id})
+
+        data_size = block.unpadded_size - header_size - _check_size(block.check_type)
+        decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=filters)
+        return decompressor.decompress(raw[header_size:header_size + data_size])
+
+    def block_data(self, i):
+        """Decompressed bytes of block i (the last block read is cached)."""
+        if self._cached_block != i:
+            block = self.blocks[i]
+            self._cached_data = self._decompress_block(block)
+            self._cached_block = i
+            triage_metrics.add('bytesRead', block.unpadded_size)
+            triage_metrics.add('bytesDecompressed', len(self._cached_data))
+        return self._cached_data
+
+    def read(self, offset, length):
+        """
+        Return `length` bytes of the decompressed log starting at `offset`,
+        decompressing only the blocks that cover the range.
+        """
+        out = []
+        end = min(offset + length, self.size)
+        i = bisect.bisect_right(self._starts, offset) - 1
+        while offset < end and 0 <= i < len(self.blocks):
+            block = self.blocks[i]
+            data = self.block_data(i)
+            start = offset - block.uncompressed_offset
+            take = min(end - offset, block.uncompressed_size - start)
+            out.append(data[start:start + take])
+            offset += take
+            i += 1
+        return b''.join(out)
+
+
+def repack_archive(archive_path, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Re-pack an .xz archive so that every `block_size` bytes of log are
+    compressed independently (one xz stream per block), making them
+    addressable by SeekableXZ. The archive is replaced atomically.
+    Returns the number of blocks written.
+    """
+    tmp_path = archive_path + '.repack'
+    blocks = 0
+    crc_in = 0
+    with lzma.open(archive_path, 'rb') as src, open(tmp_path, 'wb') as out:
+        while True:
+            chunk = src.read(block_size)
+            if not chunk:
+                break
+            crc_in = zlib.crc32(chunk, crc_in)
+            out.write(lzma.compress(chunk, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC64))
+            blocks += 1
+
+    # Verify the repacked archive before replacing the original
+    crc_out = 0
+    with lzma.open(tmp_path, 'rb') as check:
+        for chunk in iter(lambda: check.read(block_size), b''):
+            crc_out = zlib.crc32(chunk, crc_out)
+    if crc_in != crc_out:
+        os.remove(tmp_path)
+        raise ValueError(f"Repacked archive does not match original: {archive_path}")
+
+    os.replace(tmp_path, archive_path)
+    return blocks
+
+
+def repack_archives(log_dir, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Re-pack every single-block .xz archive in log_dir.
+    Returns { archive_name: block_count } for the archives that were re-packed.
+    """
+    repacked = {}
+    for fn in sorted(os.listdir(log_dir)):
+        if not fn.endswith('.xz'):
+            continue
+        path = os.path.join(log_dir, fn)
+        if len(SeekableXZ(path).blocks) > 1:
+            continue
+        repacked[fn] = repack_archive(path, block_size)
+        print(f"Re-packed {fn} into {repacked[fn]} blocks")
+    return repacked
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Re-pack log archives into multi-block .xz files")
+    parser.add_argument('log_dir', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..', LOG_FILES_FOLDER_NAME))
+    parser.add_argument('--block-size-mb', type=float, default=DEFAULT_BLOCK_SIZE // (1024 * 1024),
+                        help="uncompressed size of each block in MB (4-16 recommended)")
+    args = parser.parse_args()
+    repack_archives(os.path.abspath(args.log_dir), int(args.block_size_mb * 1024 * 1024))